@@ -1,118 +1,182 @@
 import numpy as np
-print("Imported numpy")
-from scipy import signal
-print("Imported signal")
-import matplotlib.pyplot as plt
-print("Imported pyplot")
+import argparse
 
-print("Starting script analyze_filter.py...")
+from data_io import save_table, is_binary
+from filter_design import design_lowpass, frequency_response, sweep_designs, cheapest_design
+from verbosity import info, set_quiet
 
 # --- Parameters (same as filter design) ---
-print("Defining parameters...")
 FS = 50.0
 CUTOFF_FREQ = 10.0  # Added back
 FILTER_ORDER = 40   # Added back
 NUMTAPS = FILTER_ORDER + 1 # Added back
 WINDOW_TYPE = 'hamming' # Added back
+# Sweep mode (--sweep)
+SWEEP_TAPS = '11:101:2'  # start:stop:step (stop exclusive) or comma-separated tap counts
+SWEEP_WINDOWS = 'hamming,hann,blackman'
+SWEEP_CUTOFFS = f'{CUTOFF_FREQ}'
+SPEC_MAX_RIPPLE_DB = 0.1  # Largest acceptable passband ripple (dB)
+SPEC_MIN_ATTENUATION_DB = 40.0  # Smallest acceptable stopband attenuation (dB)
+SWEEP_OUTPUT_FILE = 'filter_sweep.txt'
 # ------------------
 
-# --- 1. Design Filter Coefficients ---
-# print("Designing FIR Low-pass filter: ...") # Moved after
-nyquist = FS / 2.0
-normalized_cutoff = CUTOFF_FREQ / nyquist
-print(f"Calculated nyquist={nyquist}, normalized_cutoff={normalized_cutoff}") # Added print
-try:
-    print("Attempting signal.firwin...") # Added print
-    filter_coeffs = signal.firwin(NUMTAPS, normalized_cutoff, window=WINDOW_TYPE, pass_zero='lowpass')
-    print(f"Designing FIR Low-pass filter: fs={FS}Hz, cutoff={CUTOFF_FREQ}Hz, numtaps={NUMTAPS}, window={WINDOW_TYPE}") # Moved here
-    print(f"Filter coefficients generated successfully (first 5): {filter_coeffs[:5]}") # Added print
-except Exception as e:
-    print(f"Error during signal.firwin: {e}") # Added error handling
-    exit()
-
-# --- 2. Calculate Frequency Response ---
-print("Calculating frequency response...")
-try:
-    print("Attempting signal.freqz...")
-    w, h = signal.freqz(filter_coeffs, worN=8000) 
-    print(f"signal.freqz finished. w shape: {w.shape}, h shape: {h.shape}")
-except Exception as e:
-    print(f"Error during signal.freqz: {e}")
-    exit()
-
-# --- 3. Analyze Response --- 
-print("Analyzing response characteristics...") # Re-enabled
-
-# Define approximate passband and stopband frequency ranges for analysis
-passband_freq_limit = CUTOFF_FREQ * 0.8 # e.g., up to 8 Hz
-stopband_freq_start = CUTOFF_FREQ * 1.2 # e.g., from 12 Hz
-
-# Recalculate these here for analysis
-frequencies_hz = (w / np.pi) * nyquist
-magnitude_db = 20 * np.log10(np.abs(h))
-
-# Find indices corresponding to these frequency ranges
-passband_indices = np.where(frequencies_hz <= passband_freq_limit)[0]
-stopband_indices = np.where(frequencies_hz >= stopband_freq_start)[0]
-
-# Default values in case analysis fails
-passband_ripple_db = np.nan
-min_attenuation_db = np.nan
-max_passband_db = 0
-min_passband_db = 0
-
-# Passband Ripple Analysis
-if len(passband_indices) > 0:
-    passband_mags_db = magnitude_db[passband_indices]
-    # Check for non-finite values before calculating max/min
-    if np.all(np.isfinite(passband_mags_db)):
-        max_passband_db = np.max(passband_mags_db)
-        min_passband_db = np.min(passband_mags_db)
-        passband_ripple_db = max_passband_db - min_passband_db
-        print(f"- Passband (0-{passband_freq_limit:.1f} Hz):")
-        print(f"  - Max Gain: {max_passband_db:.4f} dB")
-        print(f"  - Min Gain: {min_passband_db:.4f} dB")
-        print(f"  - Approx Passband Ripple: {passband_ripple_db:.4f} dB")
+
+def analyze_single():
+    """Analyzes the single FS / CUTOFF_FREQ / NUMTAPS / WINDOW_TYPE design and plots its response."""
+    # --- 1. Design Filter Coefficients ---
+    nyquist = FS / 2.0
+    normalized_cutoff = CUTOFF_FREQ / nyquist
+    info(f"Calculated nyquist={nyquist}, normalized_cutoff={normalized_cutoff}")
+    try:
+        filter_coeffs = design_lowpass(FS, CUTOFF_FREQ, NUMTAPS, window=WINDOW_TYPE)
+        info(f"Designing FIR Low-pass filter: fs={FS}Hz, cutoff={CUTOFF_FREQ}Hz, numtaps={NUMTAPS}, window={WINDOW_TYPE}")
+        info(f"Filter coefficients (first 5): {filter_coeffs[:5]}")
+    except Exception as e:
+        print(f"Error during signal.firwin: {e}")
+        exit()
+
+    # --- 2. Calculate Frequency Response ---
+    info("Calculating frequency response...")
+    try:
+        w, h = frequency_response(FS, CUTOFF_FREQ, NUMTAPS, window=WINDOW_TYPE, worN=8000)
+    except Exception as e:
+        print(f"Error during signal.freqz: {e}")
+        exit()
+
+    # --- 3. Analyze Response ---
+    info("Analyzing response characteristics...")
+
+    # Define approximate passband and stopband frequency ranges for analysis
+    passband_freq_limit = CUTOFF_FREQ * 0.8 # e.g., up to 8 Hz
+    stopband_freq_start = CUTOFF_FREQ * 1.2 # e.g., from 12 Hz
+
+    # Recalculate these here for analysis
+    frequencies_hz = (w / np.pi) * nyquist
+    magnitude_db = 20 * np.log10(np.abs(h))
+
+    # Find indices corresponding to these frequency ranges
+    passband_indices = np.where(frequencies_hz <= passband_freq_limit)[0]
+    stopband_indices = np.where(frequencies_hz >= stopband_freq_start)[0]
+
+    # Default values in case analysis fails
+    passband_ripple_db = np.nan
+    min_attenuation_db = np.nan
+    max_passband_db = 0
+    min_passband_db = 0
+
+    # Passband Ripple Analysis
+    if len(passband_indices) > 0:
+        passband_mags_db = magnitude_db[passband_indices]
+        # Check for non-finite values before calculating max/min
+        if np.all(np.isfinite(passband_mags_db)):
+            max_passband_db = np.max(passband_mags_db)
+            min_passband_db = np.min(passband_mags_db)
+            passband_ripple_db = max_passband_db - min_passband_db
+            print(f"- Passband (0-{passband_freq_limit:.1f} Hz):")
+            print(f"  - Max Gain: {max_passband_db:.4f} dB")
+            print(f"  - Min Gain: {min_passband_db:.4f} dB")
+            print(f"  - Approx Passband Ripple: {passband_ripple_db:.4f} dB")
+        else:
+            print("- Passband analysis skipped due to non-finite values.")
     else:
-        print("- Passband analysis skipped due to non-finite values.")
-else:
-    print("- Could not analyze passband (no indices).")
-
-# Stopband Attenuation Analysis
-if len(stopband_indices) > 0:
-    stopband_mags_db = magnitude_db[stopband_indices]
-    if np.all(np.isfinite(stopband_mags_db)):
-        min_attenuation_db = np.max(stopband_mags_db) # Max gain = min attenuation
-        print(f"- Stopband ({stopband_freq_start:.1f}-{nyquist:.1f} Hz):")
-        print(f"  - Minimum Attenuation (Max Stopband Gain): {min_attenuation_db:.4f} dB")
+        print("- Could not analyze passband (no indices).")
+
+    # Stopband Attenuation Analysis
+    if len(stopband_indices) > 0:
+        stopband_mags_db = magnitude_db[stopband_indices]
+        if np.all(np.isfinite(stopband_mags_db)):
+            min_attenuation_db = np.max(stopband_mags_db) # Max gain = min attenuation
+            print(f"- Stopband ({stopband_freq_start:.1f}-{nyquist:.1f} Hz):")
+            print(f"  - Minimum Attenuation (Max Stopband Gain): {min_attenuation_db:.4f} dB")
+        else:
+            print("- Stopband analysis skipped due to non-finite values.")
     else:
-        print("- Stopband analysis skipped due to non-finite values.")
-else:
-    print("- Could not analyze stopband (no indices).")
-
-# --- 4. Plot Frequency Response ---
-print("Generating frequency response plot...") # Re-enabled
-try:
-    plt.figure(figsize=(10, 6))
-    plt.plot(frequencies_hz, magnitude_db)
-    plt.title(f'FIR Filter Frequency Response ({WINDOW_TYPE} Window, {NUMTAPS} taps)')
-    plt.xlabel('Frequency (Hz)')
-    plt.ylabel('Magnitude (dB)')
-    plt.ylim(-100, 5) # Adjust y-axis limits
-    plt.grid(True, which='both', axis='both')
-    plt.axvline(CUTOFF_FREQ, color='red', linestyle='--', alpha=0.7, label=f'Cutoff ({CUTOFF_FREQ} Hz)')
-    # Re-enable annotation lines using calculated values
-    if not np.isnan(min_attenuation_db):
-        plt.axhline(min_attenuation_db, color='green', linestyle=':', alpha=0.7, label=f'Min Atten ({min_attenuation_db:.2f} dB)')
-    if not np.isnan(passband_ripple_db):
-        plt.axhline(max_passband_db, color='orange', linestyle=':', alpha=0.7, label=f'Passband Max/Min')
-        plt.axhline(min_passband_db, color='orange', linestyle=':', alpha=0.7)
-    plt.legend()
-
-    OUTPUT_PLOT_FILE = 'filter_frequency_response.png' # Define here
-    plt.savefig(OUTPUT_PLOT_FILE)
-    print(f"Frequency response plot saved to {OUTPUT_PLOT_FILE}")
-except Exception as e:
-    print(f"Error during plotting or saving: {e}") # More specific error message
-
-print("Filter analysis finished.") 
\ No newline at end of file
+        print("- Could not analyze stopband (no indices).")
+
+    # --- 4. Plot Frequency Response ---
+    info("Generating frequency response plot...")
+    try:
+        from plotting import plt  # Agg backend
+        plt.figure(figsize=(10, 6))
+        plt.plot(frequencies_hz, magnitude_db)
+        plt.title(f'FIR Filter Frequency Response ({WINDOW_TYPE} Window, {NUMTAPS} taps)')
+        plt.xlabel('Frequency (Hz)')
+        plt.ylabel('Magnitude (dB)')
+        plt.ylim(-100, 5) # Adjust y-axis limits
+        plt.grid(True, which='both', axis='both')
+        plt.axvline(CUTOFF_FREQ, color='red', linestyle='--', alpha=0.7, label=f'Cutoff ({CUTOFF_FREQ} Hz)')
+        # Re-enable annotation lines using calculated values
+        if not np.isnan(min_attenuation_db):
+            plt.axhline(min_attenuation_db, color='green', linestyle=':', alpha=0.7, label=f'Min Atten ({min_attenuation_db:.2f} dB)')
+        if not np.isnan(passband_ripple_db):
+            plt.axhline(max_passband_db, color='orange', linestyle=':', alpha=0.7, label=f'Passband Max/Min')
+            plt.axhline(min_passband_db, color='orange', linestyle=':', alpha=0.7)
+        plt.legend()
+
+        OUTPUT_PLOT_FILE = 'filter_frequency_response.png' # Define here
+        plt.savefig(OUTPUT_PLOT_FILE)
+        info(f"Frequency response plot saved to {OUTPUT_PLOT_FILE}")
+    except Exception as e:
+        print(f"Error during plotting or saving: {e}") # More specific error message
+
+    info("Filter analysis finished.")
+
+
+def parse_taps(value):
+    """'11:101:2' -> range(11, 101, 2); '21,41,61' -> [21, 41, 61]."""
+    if ':' in value:
+        return list(range(*[int(part) for part in value.split(':')]))
+    return [int(part) for part in value.split(',') if part.strip()]
+
+
+def run_sweep(taps, windows, cutoffs, max_ripple_db, min_attenuation_db, output_file):
+    """Evaluates the whole design grid, saves the table and reports the cheapest design meeting the spec."""
+    print(f"Sweeping {len(taps)} tap counts x {len(windows)} windows x {len(cutoffs)} cutoffs "
+          f"({len(taps) * len(windows) * len(cutoffs)} designs) at fs={FS}Hz...")
+    sweep = sweep_designs(FS, taps, windows, cutoffs)
+    save_table(output_file, sweep)
+    print(f"Sweep table saved to {output_file}")
+
+    print(f"\n--- Cheapest design: ripple <= {max_ripple_db} dB, attenuation >= {min_attenuation_db} dB ---")
+    for cutoff in cutoffs:
+        best = cheapest_design(sweep, max_ripple_db, min_attenuation_db, cutoff=cutoff)
+        if best is None:
+            print(f"Cutoff {cutoff} Hz: no design in the grid meets the spec.")
+            continue
+        print(f"Cutoff {cutoff} Hz: {sweep['numtaps'][best]} taps, {sweep['window'][best]} window "
+              f"(ripple {sweep['passband_ripple_db'][best]:.4f} dB, "
+              f"attenuation {-sweep['max_stopband_gain_db'][best]:.2f} dB, "
+              f"group delay {sweep['group_delay_sec'][best]:.3f} s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Analyze the FIR low-pass design, or sweep a grid of designs.')
+    parser.add_argument('--sweep', action='store_true', help='Sweep tap counts, windows and cutoffs instead.')
+    parser.add_argument('--taps', type=parse_taps, default=parse_taps(SWEEP_TAPS),
+                        help=f"Tap counts as start:stop:step or a comma list (default: {SWEEP_TAPS}).")
+    parser.add_argument('--windows', default=SWEEP_WINDOWS, help=f'Comma-separated windows (default: {SWEEP_WINDOWS}).')
+    parser.add_argument('--cutoffs', default=SWEEP_CUTOFFS, help=f'Comma-separated cutoffs in Hz (default: {SWEEP_CUTOFFS}).')
+    parser.add_argument('--max-ripple', type=float, default=SPEC_MAX_RIPPLE_DB,
+                        help=f'Spec: max passband ripple in dB (default: {SPEC_MAX_RIPPLE_DB}).')
+    parser.add_argument('--min-attenuation', type=float, default=SPEC_MIN_ATTENUATION_DB,
+                        help=f'Spec: min stopband attenuation in dB (default: {SPEC_MIN_ATTENUATION_DB}).')
+    parser.add_argument('--output', default=SWEEP_OUTPUT_FILE,
+                        help=f'Sweep table file, text only (default: {SWEEP_OUTPUT_FILE}).')
+    parser.add_argument('--quiet', action='store_true', help='Only print the results, warnings and errors.')
+    args = parser.parse_args()
+    if args.quiet:
+        set_quiet()
+    if args.sweep and is_binary(args.output):
+        # Binary tables hold only numbers, and the sweep has a window-name column
+        parser.error(f'--output must be a text table in sweep mode, not {args.output}.')
+
+    if args.sweep:
+        windows = [window.strip() for window in args.windows.split(',') if window.strip()]
+        cutoffs = [float(cutoff) for cutoff in args.cutoffs.split(',') if cutoff.strip()]
+        run_sweep(args.taps, windows, cutoffs, args.max_ripple, args.min_attenuation, args.output)
+    else:
+        analyze_single()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,120 +1,364 @@
-import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+from numpy.lib.stride_tricks import sliding_window_view
 import sys
+import argparse
+
+from data_io import load_table, iter_table, TableWriter, as_float_array
+from instrumentation import stage
+from verbosity import info
 
 # --- Parameters ---
-INPUT_FILE = 'resampled_data.txt'
+INPUT_FILE = 'resampled_data.f64'
 OUTPUT_PLOT_FILE = 'frequency_spectrum.png'
 FS = 50.0  # Sampling frequency (Hz)
+CHANNELS = ['xaccel', 'yaccel']
+# Windowed (--welch) mode
+NPERSEG = 64  # Samples per segment (1.28 s at 50 Hz)
+NOVERLAP = 32  # Overlap between consecutive segments
+WINDOW_TYPE = 'hann'
+BLOCK_ROWS = 100000  # Rows read from the input per block
+TRACK_FILE = 'dominant_frequency_track.f64'  # Per-segment dominant frequency / magnitude
+SPECTROGRAM_FILE = 'spectrogram.f64'  # Per-segment magnitudes, one column per channel and bin
+SPECTROGRAM_PLOT_FILE = 'spectrogram.png'
 # ------------------
 
-# --- 1. Load Data ---
-print(f"Loading resampled data from {INPUT_FILE}...")
-try:
-    df = pd.read_csv(INPUT_FILE, sep='\t', header=0)
-except FileNotFoundError:
-    print(f"Error: Input file '{INPUT_FILE}' not found.")
-    sys.exit(1)
-except Exception as e:
-    print(f"Error reading file: {e}")
-    sys.exit(1)
-
-# Extract signals
-x_signal = df['xaccel'].values
-y_signal = df['yaccel'].values
-N = len(x_signal) # Number of samples
-
-if N == 0:
-    print("Error: No data found in the file.")
-    sys.exit(1)
-
-print(f"Analyzing {N} samples with Fs = {FS} Hz.")
-
-# --- 2. Perform FFT ---
-print("Performing FFT...")
-# Calculate FFT
-fft_x = np.fft.fft(x_signal)
-fft_y = np.fft.fft(y_signal)
-
-# Calculate corresponding frequencies
-# np.fft.fftfreq(N, d=1/FS) gives frequencies for the whole spectrum (positive and negative)
-freqs = np.fft.fftfreq(N, d=1/FS)
-
-# --- 3. Calculate Magnitude and Find Dominant Frequency ---
-# We only need the positive frequency part for magnitude analysis
-positive_freq_indices = np.where(freqs >= 0)[0]
-freqs_pos = freqs[positive_freq_indices]
-
-# Calculate magnitude (absolute value of complex FFT output)
-# Normalize by N/2 for amplitude (optional, doesn't affect dominant freq finding)
-# We take only the positive frequency part
-magnitude_x = np.abs(fft_x[positive_freq_indices])
-magnitude_y = np.abs(fft_y[positive_freq_indices])
-
-# Find the index of the maximum magnitude, *excluding* the DC component (index 0)
-# Handle cases with very few points where excluding index 0 might be problematic
-if len(freqs_pos) > 1:
-    dominant_idx_x = np.argmax(magnitude_x[1:]) + 1 # Add 1 because we skipped index 0
-    dominant_freq_x = freqs_pos[dominant_idx_x]
-    dominant_mag_x = magnitude_x[dominant_idx_x]
-
-    dominant_idx_y = np.argmax(magnitude_y[1:]) + 1 # Add 1 because we skipped index 0
-    dominant_freq_y = freqs_pos[dominant_idx_y]
-    dominant_mag_y = magnitude_y[dominant_idx_y]
-else: # Only DC component exists or just one point
-    dominant_idx_x = 0
-    dominant_freq_x = freqs_pos[0]
-    dominant_mag_x = magnitude_x[0]
-    dominant_idx_y = 0
-    dominant_freq_y = freqs_pos[0]
-    dominant_mag_y = magnitude_y[0]
-
-print("\n--- Dominant Frequencies (excluding DC) ---")
-print(f"X Accel: {dominant_freq_x:.2f} Hz (Magnitude: {dominant_mag_x:.2f})")
-print(f"Y Accel: {dominant_freq_y:.2f} Hz (Magnitude: {dominant_mag_y:.2f})")
-
-# --- 4. Visualize Spectrum ---
-print("\nGenerating frequency spectrum plot...")
-fig, axes = plt.subplots(nrows=2, ncols=1, figsize=(12, 8), sharex=True)
-fig.suptitle('Frequency Spectrum (Resampled Data)', fontsize=16)
-
-# Plot X Spectrum (positive frequencies only, excluding DC for visual clarity)
-if len(freqs_pos) > 1:
-    axes[0].plot(freqs_pos[1:], magnitude_x[1:], label='xaccel', color='blue')
-    # Highlight dominant frequency
-    axes[0].axvline(dominant_freq_x, color='blue', linestyle='--', alpha=0.7, label=f'Dom X: {dominant_freq_x:.2f} Hz')
-else:
-    axes[0].plot(freqs_pos, magnitude_x, label='xaccel', color='blue') # Plot DC if it's the only point
-axes[0].set_ylabel('Magnitude')
-axes[0].set_title('X Acceleration Spectrum')
-axes[0].grid(True)
-axes[0].legend()
-
-# Plot Y Spectrum (positive frequencies only, excluding DC)
-if len(freqs_pos) > 1:
-    axes[1].plot(freqs_pos[1:], magnitude_y[1:], label='yaccel', color='red')
-    # Highlight dominant frequency
-    axes[1].axvline(dominant_freq_y, color='red', linestyle='--', alpha=0.7, label=f'Dom Y: {dominant_freq_y:.2f} Hz')
-else:
-    axes[1].plot(freqs_pos, magnitude_y, label='yaccel', color='red')
-axes[1].set_xlabel('Frequency (Hz)')
-axes[1].set_ylabel('Magnitude')
-axes[1].set_title('Y Acceleration Spectrum')
-axes[1].grid(True)
-axes[1].legend()
-
-# Adjust layout and x-axis limit (up to Nyquist)
-plt.xlim(0, FS / 2)
-plt.tight_layout(rect=[0, 0.03, 1, 0.95])
-
-# Save the plot
-try:
-    plt.savefig(OUTPUT_PLOT_FILE)
-    print(f"Spectrum plot saved to {OUTPUT_PLOT_FILE}")
-except Exception as e:
-    print(f"Error saving plot: {e}")
-
-# plt.show()
-
-print("Frequency analysis finished.")
\ No newline at end of file
+
+# --- Spectrum Analysis ---
+def compute_spectrum(signals, fs=FS):
+    """Magnitude spectrum and dominant frequency (excluding DC) of each column of signals.
+
+    signals is (n_samples,) or (n_samples, n_channels). Returns a dict with 'freqs'
+    (positive frequencies), 'magnitude' (n_freqs[, n_channels]), 'dominant_idx',
+    'dominant_freq' and 'dominant_mag' (one value per channel).
+    """
+    signals = as_float_array(signals)  # float32 input: complex64 FFT, float32 magnitudes
+    N = signals.shape[0] # Number of samples
+    if N == 0:
+        raise ValueError("No data to analyze.")
+
+    # Real-input FFT of every channel along the sample axis: only the non-negative half
+    # of the spectrum is computed. For even N the last rfft bin is the Nyquist bin, which
+    # np.fft.fftfreq labels as negative, so it is dropped to keep the previous results.
+    n_pos = N // 2 + (N % 2)
+    fft_signals = np.fft.rfft(signals, axis=0)[:n_pos]
+    freqs_pos = np.fft.rfftfreq(N, d=1/fs)[:n_pos]
+
+    # Calculate magnitude (absolute value of complex FFT output)
+    # Normalize by N/2 for amplitude (optional, doesn't affect dominant freq finding)
+    magnitude = np.abs(fft_signals)
+
+    return spectrum_peaks(freqs_pos, magnitude)
+
+
+def spectrum_peaks(freqs, magnitude):
+    """compute_spectrum()'s result dict for given positive frequencies and magnitudes."""
+    # Find the index of the maximum magnitude, *excluding* the DC component (index 0)
+    # Handle cases with very few points where excluding index 0 might be problematic
+    if len(freqs) > 1:
+        dominant_idx = np.argmax(magnitude[1:], axis=0) + 1 # Add 1 because we skipped index 0
+    else: # Only DC component exists or just one point
+        dominant_idx = np.zeros(magnitude.shape[1:], dtype=np.intp)
+
+    return {
+        'freqs': freqs,
+        'magnitude': magnitude,
+        'dominant_idx': dominant_idx,
+        'dominant_freq': freqs[dominant_idx],
+        'dominant_mag': np.take_along_axis(magnitude, np.expand_dims(dominant_idx, 0), axis=0)[0],
+    }
+# -------------------------
+
+
+# --- Streaming STFT / Welch ---
+class StreamingSpectrum:
+    """Overlapping-segment rfft analysis (STFT + Welch PSD) fed block by block.
+
+    Only the last nperseg - 1 samples are kept between blocks, so memory does not grow with
+    the recording. Each completed segment is mean-removed and windowed, as scipy's welch
+    does by default, and yields one row of magnitudes plus its dominant frequency.
+    """
+
+    def __init__(self, fs=FS, nperseg=NPERSEG, noverlap=NOVERLAP, window=WINDOW_TYPE, n_channels=len(CHANNELS)):
+        if not 0 <= noverlap < nperseg:
+            raise ValueError("noverlap must be at least 0 and smaller than nperseg.")
+        self.fs = fs
+        self.nperseg = nperseg
+        self.step = nperseg - noverlap
+        self.n_channels = n_channels
+        self.freqs = np.fft.rfftfreq(nperseg, d=1/fs)
+        from scipy.signal import get_window
+        self._window = get_window(window, nperseg)[:, np.newaxis]
+        self._pending = np.empty((0, n_channels))  # Samples not yet covered by a full segment
+        self._next_start = 0  # Absolute sample index of the next segment start
+        self._consumed = 0  # Absolute sample index of self._pending[0]
+        self._power_sum = np.zeros((len(self.freqs), n_channels))
+        self.n_segments = 0
+        self.n_samples = 0
+
+    def update(self, block):
+        """Feeds (n, n_channels) samples; returns (segment_centers_sec, magnitude, dominant_idx).
+
+        magnitude is (n_new_segments, n_freqs, n_channels) and dominant_idx excludes DC.
+        """
+        block = np.asarray(block, dtype=np.float64).reshape(-1, self.n_channels)
+        self.n_samples += len(block)
+        buffer = np.concatenate((self._pending, block))
+        offset = self._next_start - self._consumed
+        n_new = max(0, (len(buffer) - offset - self.nperseg) // self.step + 1)
+
+        if n_new > 0:
+            # (n_new, nperseg, n_channels) view of every complete segment in the buffer
+            segments = sliding_window_view(buffer[offset:], self.nperseg, axis=0)[::self.step][:n_new]
+            segments = np.moveaxis(segments, -1, 1)
+            segments = (segments - segments.mean(axis=1, keepdims=True)) * self._window
+            spectra = np.fft.rfft(segments, axis=1)
+            power = spectra.real ** 2 + spectra.imag ** 2
+            self._power_sum += power.sum(axis=0)
+            magnitude = np.sqrt(power)
+            starts = self._next_start + self.step * np.arange(n_new)
+            centers_sec = (starts + self.nperseg / 2) / self.fs
+            self.n_segments += n_new
+            self._next_start += self.step * n_new
+        else:
+            magnitude = np.empty((0, len(self.freqs), self.n_channels))
+            centers_sec = np.empty(0)
+
+        # Keep only what the next segment still needs
+        keep_from = min(self._next_start - self._consumed, len(buffer))
+        self._pending = buffer[keep_from:].copy()
+        self._consumed += keep_from
+        dominant_idx = np.argmax(magnitude[:, 1:], axis=1) + 1 if len(self.freqs) > 1 else \
+            np.zeros((len(centers_sec), self.n_channels), dtype=np.intp)
+        return centers_sec, magnitude, dominant_idx
+
+    def welch_psd(self):
+        """Average one-sided power spectral density over all segments so far (scipy welch scaling)."""
+        if self.n_segments == 0:
+            raise ValueError(f"Not enough samples for a single {self.nperseg}-sample segment.")
+        psd = self._power_sum / (self.n_segments * self.fs * np.sum(self._window ** 2))
+        # One-sided: double everything except DC (and Nyquist for even nperseg)
+        psd[1:len(self.freqs) - (1 if self.nperseg % 2 == 0 else 0)] *= 2
+        return psd
+# --------------------------------
+
+
+# --- Spectrum Plot ---
+def plot_spectrum(spectrum, output_plot_file=OUTPUT_PLOT_FILE, fs=FS):
+    """Plots the xaccel / yaccel spectra (columns 0 and 1 of a compute_spectrum result)."""
+    from plotting import plt  # Agg backend, loaded only when plotting
+
+    freqs_pos = spectrum['freqs']
+    magnitude_x = spectrum['magnitude'][:, 0]
+    magnitude_y = spectrum['magnitude'][:, 1]
+    dominant_freq_x, dominant_freq_y = spectrum['dominant_freq'][:2]
+
+    fig, axes = plt.subplots(nrows=2, ncols=1, figsize=(12, 8), sharex=True)
+    fig.suptitle('Frequency Spectrum (Resampled Data)', fontsize=16)
+
+    # Plot X Spectrum (positive frequencies only, excluding DC for visual clarity)
+    if len(freqs_pos) > 1:
+        axes[0].plot(freqs_pos[1:], magnitude_x[1:], label='xaccel', color='blue')
+        # Highlight dominant frequency
+        axes[0].axvline(dominant_freq_x, color='blue', linestyle='--', alpha=0.7, label=f'Dom X: {dominant_freq_x:.2f} Hz')
+    else:
+        axes[0].plot(freqs_pos, magnitude_x, label='xaccel', color='blue') # Plot DC if it's the only point
+    axes[0].set_ylabel('Magnitude')
+    axes[0].set_title('X Acceleration Spectrum')
+    axes[0].grid(True)
+    axes[0].legend()
+
+    # Plot Y Spectrum (positive frequencies only, excluding DC)
+    if len(freqs_pos) > 1:
+        axes[1].plot(freqs_pos[1:], magnitude_y[1:], label='yaccel', color='red')
+        # Highlight dominant frequency
+        axes[1].axvline(dominant_freq_y, color='red', linestyle='--', alpha=0.7, label=f'Dom Y: {dominant_freq_y:.2f} Hz')
+    else:
+        axes[1].plot(freqs_pos, magnitude_y, label='yaccel', color='red')
+    axes[1].set_xlabel('Frequency (Hz)')
+    axes[1].set_ylabel('Magnitude')
+    axes[1].set_title('Y Acceleration Spectrum')
+    axes[1].grid(True)
+    axes[1].legend()
+
+    # Adjust layout and x-axis limit (up to Nyquist)
+    plt.xlim(0, fs / 2)
+    plt.tight_layout(rect=[0, 0.03, 1, 0.95])
+
+    # Save the plot
+    try:
+        plt.savefig(output_plot_file)
+        info(f"Spectrum plot saved to {output_plot_file}")
+    except Exception as e:
+        print(f"Error saving plot: {e}")
+    finally:
+        plt.close(fig)
+# ---------------------
+
+
+# --- Spectrogram Plot ---
+def plot_spectrogram(spectrogram_file, track_file, freqs, output_plot_file=SPECTROGRAM_PLOT_FILE):
+    """Plots each channel's spectrogram with its dominant-frequency track.
+
+    The spectrogram is streamed with iter_table and reduced block by block to at most
+    one column per pixel (the maximum of each run of segments, so short bursts stay
+    visible), like the envelope decimation of the time-series plots.
+    """
+    from plotting import plt, decimate_envelope, FIGSIZE, DPI
+
+    track = load_table(track_file)
+    n_segments = len(track['time'])
+    if n_segments == 0:
+        print("No segments to plot.")
+        return
+    n_columns = FIGSIZE[0] * DPI
+    bucket = -(-n_segments // n_columns)  # Segments per image column
+    images = {channel: [] for channel in CHANNELS}
+    names = {channel: [f'{channel}_{i}' for i in range(len(freqs))] for channel in CHANNELS}
+    # Blocks hold whole buckets, so no bucket is split between two blocks
+    block_rows = bucket * max(1, BLOCK_ROWS // bucket)
+    for block in iter_table(spectrogram_file, columns=[name for channel in CHANNELS for name in names[channel]],
+                            block_rows=block_rows):
+        for channel in CHANNELS:
+            magnitude = np.column_stack([block[name] for name in names[channel]])
+            images[channel].append(np.maximum.reduceat(magnitude, np.arange(0, len(magnitude), bucket), axis=0))
+    images = {channel: np.concatenate(parts).T for channel, parts in images.items()}
+    # Each segment covers one hop around its centre, each image column bucket segments
+    hop = track['time'][1] - track['time'][0] if n_segments > 1 else 1.0
+    left = track['time'][0] - hop / 2
+    extent = [left, left + images[CHANNELS[0]].shape[1] * bucket * hop, freqs[0], freqs[-1]]
+
+    fig, axes = plt.subplots(nrows=len(CHANNELS), ncols=1, figsize=(12, 8), sharex=True)
+    fig.suptitle('Spectrogram and Dominant Frequency Track', fontsize=16)
+    for ax, channel in zip(axes, CHANNELS):
+        ax.imshow(images[channel], aspect='auto', origin='lower', extent=extent, cmap='viridis')
+        ax.plot(*decimate_envelope(track['time'], track[f'{channel}_dominant_hz'], n_columns),
+                color='white', linewidth=1, label='Dominant')
+        ax.set_ylabel('Frequency (Hz)')
+        ax.set_title(f'{channel} Spectrogram')
+        ax.legend(loc='upper right')
+    axes[-1].set_xlabel('Time (s)')
+    plt.tight_layout(rect=[0, 0.03, 1, 0.95])
+
+    try:
+        plt.savefig(output_plot_file)
+        print(f"Spectrogram plot saved to {output_plot_file}")
+    except Exception as e:
+        print(f"Error saving plot: {e}")
+    finally:
+        plt.close(fig)
+# ------------------------
+
+
+def run_welch(input_file, nperseg=NPERSEG, noverlap=NOVERLAP, window=WINDOW_TYPE):
+    """Streams input_file through StreamingSpectrum, writing the track and spectrogram incrementally."""
+    analyzer = StreamingSpectrum(FS, nperseg, noverlap, window, n_channels=len(CHANNELS))
+    track_columns = ['time'] + [f'{channel}_{kind}' for channel in CHANNELS for kind in ('dominant_hz', 'dominant_mag')]
+    spectrogram_columns = ['time'] + [f'{channel}_{i}' for channel in CHANNELS for i in range(len(analyzer.freqs))]
+    start_time_sec = None
+
+    print(f"Streaming STFT: nperseg={nperseg}, noverlap={noverlap}, window={window}, "
+          f"resolution={analyzer.freqs[1]:.3f} Hz")
+    with stage('stft', window=window, nperseg=nperseg) as record, \
+            TableWriter(TRACK_FILE, track_columns) as track_writer, \
+            TableWriter(SPECTROGRAM_FILE, spectrogram_columns) as spectrogram_writer:
+        for block in iter_table(input_file, columns=['time'] + CHANNELS, block_rows=BLOCK_ROWS):
+            if start_time_sec is None and len(block['time']) > 0:
+                start_time_sec = block['time'][0]
+            centers_sec, magnitude, dominant_idx = analyzer.update(np.column_stack([block[c] for c in CHANNELS]))
+            if len(centers_sec) == 0:
+                continue
+            times = start_time_sec + centers_sec
+            track = {'time': times}
+            spectrogram = {'time': times}
+            for j, channel in enumerate(CHANNELS):
+                track[f'{channel}_dominant_hz'] = analyzer.freqs[dominant_idx[:, j]]
+                track[f'{channel}_dominant_mag'] = magnitude[np.arange(len(times)), dominant_idx[:, j], j]
+                spectrogram.update({f'{channel}_{i}': magnitude[:, i, j] for i in range(len(analyzer.freqs))})
+            track_writer.write(track)
+            spectrogram_writer.write(spectrogram)
+        record['n_samples'] = analyzer.n_samples
+
+    print(f"Processed {analyzer.n_segments} segments.")
+    print(f"Dominant-frequency track saved to {TRACK_FILE}")
+    print(f"Spectrogram saved to {SPECTROGRAM_FILE}")
+
+    psd = analyzer.welch_psd()
+    print("\n--- Dominant Frequencies from Welch PSD (excluding DC) ---")
+    for j, channel in enumerate(CHANNELS):
+        idx = np.argmax(psd[1:, j]) + 1 if len(analyzer.freqs) > 1 else 0
+        print(f"{channel}: {analyzer.freqs[idx]:.2f} Hz (PSD: {psd[idx, j]:.4f})")
+
+    print("\nGenerating spectrogram plot...")
+    with stage('plot'):
+        plot_spectrogram(SPECTROGRAM_FILE, TRACK_FILE, analyzer.freqs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Find the dominant frequencies of the resampled data.')
+    parser.add_argument('--input', default=INPUT_FILE,
+                        help=f'Resampled data, binary or text (default: {INPUT_FILE}).')
+    parser.add_argument('--welch', action='store_true',
+                        help='Windowed STFT / Welch analysis in constant memory instead of one whole-signal FFT.')
+    parser.add_argument('--nperseg', type=int, default=NPERSEG, help=f'Samples per segment (default: {NPERSEG}).')
+    parser.add_argument('--noverlap', type=int, default=NOVERLAP, help=f'Segment overlap (default: {NOVERLAP}).')
+    parser.add_argument('--window', default=WINDOW_TYPE, help=f'Segment window (default: {WINDOW_TYPE}).')
+    args = parser.parse_args()
+
+    if args.welch:
+        try:
+            run_welch(args.input, args.nperseg, args.noverlap, args.window)
+        except FileNotFoundError:
+            print(f"Error: Input file '{args.input}' not found.")
+            sys.exit(1)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        print("Frequency analysis finished.")
+        return
+
+    # --- 1. Load Data ---
+    print(f"Loading resampled data from {args.input}...")
+    try:
+        with stage('load') as record:
+            df = load_table(args.input)
+            record['n_samples'] = len(df['time'])
+    except FileNotFoundError:
+        print(f"Error: Input file '{args.input}' not found.")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error reading file: {e}")
+        sys.exit(1)
+
+    # Extract signals
+    signals = np.column_stack((df['xaccel'], df['yaccel']))
+    N = len(signals) # Number of samples
+
+    if N == 0:
+        print("Error: No data found in the file.")
+        sys.exit(1)
+
+    print(f"Analyzing {N} samples with Fs = {FS} Hz.")
+
+    # --- 2. Perform FFT and Find Dominant Frequency ---
+    print("Performing FFT...")
+    with stage('fft', N):
+        spectrum = compute_spectrum(signals, FS)
+    dominant_freq_x, dominant_freq_y = spectrum['dominant_freq']
+    dominant_mag_x, dominant_mag_y = spectrum['dominant_mag']
+
+    print("\n--- Dominant Frequencies (excluding DC) ---")
+    print(f"X Accel: {dominant_freq_x:.2f} Hz (Magnitude: {dominant_mag_x:.2f})")
+    print(f"Y Accel: {dominant_freq_y:.2f} Hz (Magnitude: {dominant_mag_y:.2f})")
+
+    # --- 3. Visualize Spectrum ---
+    print("\nGenerating frequency spectrum plot...")
+    with stage('plot', N):
+        plot_spectrum(spectrum, OUTPUT_PLOT_FILE, FS)
+
+    # plt.show()
+
+    print("Frequency analysis finished.")
+
+
+if __name__ == '__main__':
+    main()
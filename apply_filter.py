@@ -1,93 +1,186 @@
-import pandas as pd
 import numpy as np
-from scipy import signal
-import matplotlib.pyplot as plt
 import sys
+import argparse
+
+from convolution import causal_convolve, CONVOLUTION_METHODS
+from data_io import load_table, save_table, text_export_path, load_segments, as_float_array
+from filter_design import design_lowpass
+from instrumentation import stage
+from verbosity import info
 
 # --- Parameters ---
-INPUT_FILE = 'resampled_data.txt'
-OUTPUT_FILE = 'filtered_data.txt'
+INPUT_FILE = 'resampled_data.f64'
+OUTPUT_FILE = 'filtered_data.f64'  # Binary table; .txt written only with --text
 OUTPUT_PLOT_FILE = 'filtered_comparison.png'
 
 FS = 50.0  # Sampling frequency (Hz) - should match resampling
 CUTOFF_FREQ = 10.0  # Cutoff frequency (Hz)
 FILTER_ORDER = 40  # Filter order (Numtaps = Order + 1)
 NUMTAPS = FILTER_ORDER + 1
+CHANNELS = ['xaccel', 'yaccel']  # Columns to filter
+FILTER_METHODS = ('filtfilt',) + CONVOLUTION_METHODS
 # ------------------
 
-# --- 1. Load Data ---
-print(f"Loading resampled data from {INPUT_FILE}...")
-try:
-    df = pd.read_csv(INPUT_FILE, sep='\t', header=0)
-except FileNotFoundError:
-    print(f"Error: Input file '{INPUT_FILE}' not found.")
-    print("Please run the resampling script first.")
-    sys.exit(1)
-except Exception as e:
-    print(f"Error reading file: {e}")
-    sys.exit(1)
-
-# --- 2. Design FIR Filter ---
-print(f"Designing FIR Low-pass filter: fs={FS}Hz, cutoff={CUTOFF_FREQ}Hz, numtaps={NUMTAPS}")
-# Normalize cutoff frequency to Nyquist frequency (fs/2)
-nyquist = FS / 2.0
-normalized_cutoff = CUTOFF_FREQ / nyquist
-
-# Design the filter using firwin with a Hamming window
-filter_coeffs = signal.firwin(NUMTAPS, normalized_cutoff, window='hamming', pass_zero='lowpass')
-
-# --- 3. Apply Filter ---
-print("Applying filter to xaccel and yaccel...")
-# Use filtfilt for zero-phase filtering
-filtered_x = signal.filtfilt(filter_coeffs, 1.0, df['xaccel'], padlen=FILTER_ORDER)
-filtered_y = signal.filtfilt(filter_coeffs, 1.0, df['yaccel'], padlen=FILTER_ORDER)
-
-# Add filtered data to DataFrame
-df['xaccel_filtered'] = filtered_x
-df['yaccel_filtered'] = filtered_y
-
-print("Filtering complete.")
-
-# --- 4. Save Filtered Data ---
-print(f"Saving filtered data to {OUTPUT_FILE}...")
-try:
-    df.to_csv(OUTPUT_FILE, sep='\t', index=False, float_format='%.9f', header=True)
-    print(f"Filtered data saved successfully.")
-except Exception as e:
-    print(f"Error saving filtered data: {e}")
-
-# --- 5. Visualize Comparison ---
-print("Generating comparison plot...")
-fig, axes = plt.subplots(nrows=2, ncols=1, figsize=(12, 8), sharex=True)
-fig.suptitle('Original (Resampled) vs. Filtered Data', fontsize=16)
-
-# Plot xaccel comparison
-axes[0].plot(df['time'], df['xaccel'], label='Original xaccel', color='lightblue', alpha=0.7)
-axes[0].plot(df['time'], df['xaccel_filtered'], label='Filtered xaccel', color='blue')
-axes[0].set_ylabel('X Acceleration')
-axes[0].set_title('X Acceleration: Original vs. Filtered')
-axes[0].grid(True)
-axes[0].legend()
-
-# Plot yaccel comparison
-axes[1].plot(df['time'], df['yaccel'], label='Original yaccel', color='lightcoral', alpha=0.7)
-axes[1].plot(df['time'], df['yaccel_filtered'], label='Filtered yaccel', color='red')
-axes[1].set_xlabel('Time (s)')
-axes[1].set_ylabel('Y Acceleration')
-axes[1].set_title('Y Acceleration: Original vs. Filtered')
-axes[1].grid(True)
-axes[1].legend()
-
-# Adjust layout
-plt.tight_layout(rect=[0, 0.03, 1, 0.95])
-
-# Save the plot
-try:
-    plt.savefig(OUTPUT_PLOT_FILE)
-    print(f"Comparison plot saved to {OUTPUT_PLOT_FILE}")
-except Exception as e:
-    print(f"Error saving plot: {e}")
-
-# plt.show()
-
-print("Process finished.") 
\ No newline at end of file
+
+# --- Multi-channel Filtering ---
+def filter_channels(data, coeffs, method='filtfilt', axis=0, padlen=None, out=None):
+    """Filters every channel of an (n_samples, n_channels) array in one vectorized call.
+
+    'filtfilt' is zero-phase (padlen defaults to the filter order); any convolution.py
+    method is causal. float32 data is filtered in float32. out is an optional
+    preallocated array shaped like data for the result.
+    """
+    data = as_float_array(data)
+    if method == 'filtfilt':
+        from scipy import signal
+        # Coefficients in the data's precision, or scipy would promote float32 input
+        filtered = signal.filtfilt(np.asarray(coeffs, dtype=data.dtype), data.dtype.type(1.0), data, axis=axis,
+                                   padlen=len(coeffs) - 1 if padlen is None else padlen)
+        if out is None:
+            return filtered
+        out[...] = filtered
+        return out
+    return causal_convolve(data, coeffs, method=method, axis=axis, out=out)
+
+
+def filter_channels_tail(data, coeffs, filtered, method='filtfilt'):
+    """filter_channels(data, coeffs, method) for data that extends an input already filtered into filtered.
+
+    A causal output row depends on the numtaps - 1 input rows before it (the warm-up);
+    a filtfilt row also on the numtaps - 1 rows after it, and near the end on the edge
+    padding. So only the new rows, the last numtaps - 1 earlier rows (filtfilt) and one
+    warm-up span in front of them are filtered again. Bit-identical to filtering all of
+    data, except with 'fft' (and 'auto' when it picks fft), which differs by rounding.
+    A previous input no longer than the warm-up span is simply filtered again in full:
+    np.convolve ('direct') sums in another order when the signal is shorter than the
+    filter, so those rows need not match a longer run.
+    """
+    data = as_float_array(data)
+    warmup = len(coeffs) - 1
+    n_keep = max(len(filtered) - (warmup if method == 'filtfilt' else 0), 0)
+    if n_keep <= warmup:
+        return filter_channels(data, coeffs, method)
+    start = n_keep - warmup
+    out = np.empty_like(data)
+    out[:n_keep] = filtered[:n_keep]
+    out[n_keep:] = filter_channels(data[start:], coeffs, method)[n_keep - start:]
+    return out
+
+
+def filter_segments(data, coeffs, segments, method='filtfilt'):
+    """filter_channels() applied to each gap-free segment on its own (see resample_segments).
+
+    No filter output mixes samples from both sides of a gap: causal methods restart from
+    zero state and filtfilt pads each segment's own edges (padlen shrinks for segments
+    shorter than the filter).
+    """
+    data = as_float_array(data)
+    filtered = np.empty_like(data)
+    for first, n in zip(segments['first_row'], segments['n_rows']):
+        if n == 0:
+            continue
+        rows = slice(first, first + n)
+        filter_channels(data[rows], coeffs, method, padlen=min(len(coeffs) - 1, n - 1), out=filtered[rows])
+    return filtered
+# -------------------------------
+
+
+# --- Comparison Plot ---
+def plot_comparison(time, original, filtered, output_plot_file=OUTPUT_PLOT_FILE,
+                    title='Original (Resampled) vs. Filtered Data', filtered_label='Filtered',
+                    panel_suffix='Filtered'):
+    """Plots original vs. filtered xaccel / yaccel (columns 0 and 1) in two stacked subplots."""
+    from plotting import stacked_plot  # matplotlib is only loaded when something is plotted
+
+    panels = []
+    for j, (axis_name, light, dark) in enumerate((('X', 'lightblue', 'blue'), ('Y', 'lightcoral', 'red'))):
+        channel = f'{axis_name.lower()}accel'
+        panels.append({
+            'title': f'{axis_name} Acceleration: Original vs. {panel_suffix}',
+            'ylabel': f'{axis_name} Acceleration',
+            'series': [(time, original[:, j], {'label': f'Original {channel}', 'color': light, 'alpha': 0.7}),
+                       (time, filtered[:, j], {'label': f'{filtered_label} {channel}', 'color': dark})],
+        })
+    if stacked_plot().draw(title, panels, output_plot_file):
+        info(f"Comparison plot saved to {output_plot_file}")
+# -----------------------
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply the FIR low-pass filter to the resampled data.')
+    parser.add_argument('--method', choices=FILTER_METHODS, default='filtfilt',
+                        help="Filtering method (default: zero-phase 'filtfilt').")
+    parser.add_argument('--input', default=INPUT_FILE,
+                        help=f'Resampled data, binary or text (default: {INPUT_FILE}).')
+    parser.add_argument('--text', action='store_true',
+                        help=f'Also export the result as text ({text_export_path(OUTPUT_FILE)}).')
+    parser.add_argument('--float32', action='store_true',
+                        help='Compact mode: filter in float32 (error bounds in pipeline.py).')
+    args = parser.parse_args()
+
+    # --- 1. Load Data ---
+    print(f"Loading resampled data from {args.input}...")
+    try:
+        with stage('load') as record:
+            data = load_table(args.input)
+            segments = load_segments(args.input)
+            record['n_samples'] = len(data['time'])
+    except FileNotFoundError:
+        print(f"Error: Input file '{args.input}' not found.")
+        print("Please run the resampling script first.")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error reading file: {e}")
+        sys.exit(1)
+    n_samples = len(data['time'])
+
+    # --- 2. Design FIR Filter ---
+    print(f"Designing FIR Low-pass filter: fs={FS}Hz, cutoff={CUTOFF_FREQ}Hz, numtaps={NUMTAPS}")
+    # Design the filter using firwin with a Hamming window
+    with stage('design', numtaps=NUMTAPS):
+        filter_coeffs = design_lowpass(FS, CUTOFF_FREQ, NUMTAPS, window='hamming')
+
+    # --- 3. Apply Filter ---
+    print(f"Applying filter ({args.method}) to {', '.join(CHANNELS)}...")
+    # All channels are filtered together along the sample axis
+    with stage('filter', n_samples, method=args.method, numtaps=NUMTAPS):
+        # Input and output buffers are allocated once, in the working precision
+        channels = np.empty((n_samples, len(CHANNELS)), dtype=np.float32 if args.float32 else np.float64)
+        for i, channel in enumerate(CHANNELS):
+            channels[:, i] = data[channel]
+        if segments is None:
+            filtered = filter_channels(channels, filter_coeffs, method=args.method, out=np.empty_like(channels))
+        else:
+            # The input was resampled with --max-gap: never filter across a gap
+            print(f"Filtering {len(segments['n_rows'])} segment(s) separately.")
+            filtered = filter_segments(channels, filter_coeffs, segments, method=args.method)
+
+    # Output table: input columns followed by one filtered column per channel
+    df = dict(data)
+    df.update({f'{channel}_filtered': filtered[:, i] for i, channel in enumerate(CHANNELS)})
+
+    print("Filtering complete.")
+
+    # --- 4. Save Filtered Data ---
+    print(f"Saving filtered data to {OUTPUT_FILE}...")
+    try:
+        with stage('save', n_samples):
+            save_table(OUTPUT_FILE, df)
+            if args.text:
+                save_table(text_export_path(OUTPUT_FILE), df)
+        if args.text:
+            print(f"Text export written to {text_export_path(OUTPUT_FILE)}.")
+        print(f"Filtered data saved successfully.")
+    except Exception as e:
+        print(f"Error saving filtered data: {e}")
+
+    # --- 5. Visualize Comparison ---
+    print("Generating comparison plot...")
+    with stage('plot', n_samples):
+        plot_comparison(df['time'], channels, filtered, OUTPUT_PLOT_FILE)
+
+    print("Process finished.")
+
+
+if __name__ == '__main__':
+    main()
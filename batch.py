@@ -0,0 +1,198 @@
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from apply_filter import FILTER_METHODS
+from filter_design import design_lowpass
+from pipeline import run_pipeline, load_input, CHANNELS, RESAMPLE_METHODS
+from instrumentation import stage, set_metrics_file
+from verbosity import set_quiet
+import result_cache
+
+# --- Parameters ---
+FILE_PATTERN = '*.txt'  # Pattern used when an input is a directory
+OUTPUT_DIR = 'batch_output'  # One sub-directory per recording, plus the report
+REPORT_FILE = 'batch_report.txt'
+TARGET_FS = 50.0  # Target sampling frequency (Hz)
+CUTOFF_FREQ = 10.0  # Low-pass cutoff frequency (Hz)
+FILTER_ORDER = 40  # Filter order (Numtaps = Order + 1)
+WINDOW_TYPE = 'hamming'
+BATCH_STAGES = ('resample', 'filter', 'analyze')
+# ------------------
+
+# Set once per worker process by _init_worker
+_worker_settings = None
+
+
+def _init_worker(settings):
+    """Receives the shared settings (including the precomputed filter coefficients)."""
+    global _worker_settings
+    _worker_settings = settings
+    # Keep the stage chatter of each file out of the batch progress report
+    set_quiet()
+    if settings.get('metrics'):
+        set_metrics_file(settings['metrics'])
+    result_cache.set_cache_dir(settings.get('cache_dir'))
+
+
+def process_file(path, settings=None):
+    """Runs resample + filter + spectrum on one recording; returns a report row (dict)."""
+    settings = settings if settings is not None else _worker_settings
+    started = time.perf_counter()
+    row = {'file': path, 'status': 'ok', 'n_samples': 0, 'seconds': 0.0, 'error': ''}
+    try:
+        with stage('load', file=path) as record:
+            time_sec, data = load_input(path, raw=True, dtype='float32' if settings.get('float32') else 'float64')
+            record['n_samples'] = len(time_sec)
+        if len(time_sec) == 0:
+            raise ValueError("No data found in the file.")
+        # With plots, each worker renders its own files, so the PNGs are drawn in parallel too
+        stages = BATCH_STAGES + (('visualize',) if settings.get('plots') else ())
+        results = run_pipeline(time_sec, data, stages=stages, fs=settings['fs'],
+                               cutoff=settings['cutoff'], filter_order=settings['order'],
+                               window=settings['window'],
+                               resample_method=settings['resample_method'],
+                               filter_method=settings['filter_method'],
+                               output_dir=os.path.join(settings['output_dir'],
+                                                       output_subdir(path, settings.get('input_root'))),
+                               save_intermediates=settings['save_outputs'],
+                               coeffs=settings['coeffs'], max_gap=settings.get('max_gap'),
+                               source=os.path.abspath(path))
+        row['n_samples'] = len(results['time'])
+        for name, freq in zip(CHANNELS, results['spectrum']['dominant_freq']):
+            row[f'{name}_dominant_hz'] = float(freq)
+    except Exception as e:
+        row['status'] = 'failed'
+        row['error'] = f"{type(e).__name__}: {e}"
+    row['seconds'] = time.perf_counter() - started
+    return row
+
+
+def output_subdir(path, root=None):
+    """Output sub-directory of a recording: its path below root without the extension (default: its stem).
+
+    Mirroring the input tree keeps a/log.txt and b/log.txt apart.
+    """
+    relative = os.path.relpath(os.path.abspath(path), root) if root else os.path.basename(path)
+    return os.path.splitext(relative)[0]
+
+
+def collect_files(inputs, pattern=FILE_PATTERN):
+    """Expands directories (using pattern) and globs into a sorted, de-duplicated file list."""
+    files = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            files.update(glob.glob(os.path.join(item, pattern)))
+        else:
+            files.update(glob.glob(item))
+    return sorted(path for path in files if os.path.isfile(path))
+
+
+def run_batch(files, settings, workers=None):
+    """Processes files on a process pool, printing progress; returns the report rows."""
+    # Largest files first so a big recording never ends up alone at the tail of the batch
+    files = sorted(files, key=os.path.getsize, reverse=True)
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(settings,)) as executor:
+        futures = {executor.submit(process_file, path): path for path in files}
+        for done, future in enumerate(as_completed(futures), start=1):
+            row = future.result()
+            rows.append(row)
+            status = 'ok' if row['status'] == 'ok' else f"FAILED ({row['error']})"
+            print(f"[{done}/{len(files)}] {row['file']}: {status} in {row['seconds']:.2f}s")
+    rows.sort(key=lambda row: row['file'])
+    return rows
+
+
+def write_report(rows, report_path):
+    """Writes the per-file report as a tab-separated table."""
+    columns = ['file', 'status', 'n_samples', 'seconds'] + [f'{name}_dominant_hz' for name in CHANNELS] + ['error']
+    with open(report_path, 'w') as f:
+        f.write('\t'.join(columns) + '\n')
+        for row in rows:
+            values = []
+            for column in columns:
+                value = row.get(column, '')
+                values.append(f'{value:.6f}' if isinstance(value, float) else str(value))
+            f.write('\t'.join(values) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Resample, filter and analyze many recordings in parallel.')
+    parser.add_argument('inputs', nargs='+', help='Directories and/or glob patterns of raw logs.')
+    parser.add_argument('--pattern', default=FILE_PATTERN, help=f'File pattern inside directories (default: {FILE_PATTERN}).')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count).')
+    parser.add_argument('--output-dir', default=OUTPUT_DIR, help=f'Output directory (default: {OUTPUT_DIR}).')
+    parser.add_argument('--save-outputs', action='store_true',
+                        help='Write resampled_data.f64 / filtered_data.f64 for every recording.')
+    parser.add_argument('--metrics', default=None,
+                        help='Append per-stage timing / memory records (JSON lines) of every worker to this file.')
+    parser.add_argument('--plots', action='store_true',
+                        help='Also render the resampled / filtered / spectrum plots of every recording.')
+    parser.add_argument('--fs', type=float, default=TARGET_FS, help=f'Target sampling frequency in Hz (default: {TARGET_FS}).')
+    parser.add_argument('--cutoff', type=float, default=CUTOFF_FREQ, help=f'Low-pass cutoff in Hz (default: {CUTOFF_FREQ}).')
+    parser.add_argument('--order', type=int, default=FILTER_ORDER, help=f'FIR filter order (default: {FILTER_ORDER}).')
+    parser.add_argument('--window', default=WINDOW_TYPE, help=f'firwin window type (default: {WINDOW_TYPE}).')
+    parser.add_argument('--resample-method', choices=RESAMPLE_METHODS, default='interp')
+    parser.add_argument('--filter-method', choices=FILTER_METHODS, default='filtfilt')
+    parser.add_argument('--float32', action='store_true',
+                        help='Compact mode: process the channels in float32 (error bounds in pipeline.py).')
+    parser.add_argument('--max-gap', type=float, default=None, metavar='SEC',
+                        help='Resample and filter the stretches between gaps longer than SEC seconds separately.')
+    parser.add_argument('--cache-dir', default=None,
+                        help=f'Stage result cache shared by the workers (default: {result_cache.CACHE_DIR} '
+                             'inside the output directory).')
+    parser.add_argument('--no-cache', action='store_true', help='Recompute every recording from scratch.')
+    args = parser.parse_args()
+
+    files = collect_files(args.inputs, args.pattern)
+    if not files:
+        print("Error: No input files found.")
+        sys.exit(1)
+    os.makedirs(args.output_dir, exist_ok=True)
+    input_root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in files])
+    subdirs = {}
+    for path in files:
+        subdirs.setdefault(output_subdir(path, input_root), []).append(path)
+    clashes = [paths for paths in subdirs.values() if len(paths) > 1]
+    if clashes:
+        print(f"Error: Inputs would share an output directory: {', '.join(clashes[0])}.")
+        sys.exit(1)
+
+    # Design the filter once; every worker receives the same coefficients
+    print(f"Designing FIR Low-pass filter: fs={args.fs}Hz, cutoff={args.cutoff}Hz, numtaps={args.order + 1}, window={args.window}")
+    settings = {
+        'fs': args.fs, 'cutoff': args.cutoff, 'order': args.order, 'window': args.window,
+        'resample_method': args.resample_method, 'filter_method': args.filter_method,
+        'output_dir': args.output_dir, 'save_outputs': args.save_outputs, 'plots': args.plots,
+        'metrics': args.metrics, 'max_gap': args.max_gap, 'float32': args.float32, 'input_root': input_root,
+        'cache_dir': None if args.no_cache else args.cache_dir or os.path.join(args.output_dir, result_cache.CACHE_DIR),
+        'coeffs': design_lowpass(args.fs, args.cutoff, args.order + 1, window=args.window),
+    }
+
+    print(f"Processing {len(files)} file(s)...")
+    started = time.perf_counter()
+    rows = run_batch(files, settings, args.workers)
+    elapsed = time.perf_counter() - started
+
+    # Only after every worker is done: drops the results superseded by this batch
+    result_cache.set_cache_dir(settings['cache_dir'])
+    result_cache.prune()
+
+    report_path = os.path.join(args.output_dir, REPORT_FILE)
+    write_report(rows, report_path)
+    failed = [row for row in rows if row['status'] != 'ok']
+    print(f"\nBatch finished in {elapsed:.2f}s: {len(rows) - len(failed)} ok, {len(failed)} failed.")
+    for row in failed:
+        print(f"  {row['file']}: {row['error']}")
+    print(f"Report saved to {report_path}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
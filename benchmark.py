@@ -0,0 +1,230 @@
+import numpy as np
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from convolution import causal_convolve
+from filter_design import design_lowpass
+from streaming_filter import StreamingFIRFilter
+
+# --- Parameters ---
+FS = 50.0  # Sampling frequency of the synthetic signals (Hz)
+CUTOFF_FREQ = 10.0  # Low-pass cutoff (Hz)
+SIZE_EXPONENTS = (3, 4, 5, 6, 7, 8)  # Signal lengths 10^3 .. 10^8 samples
+DEFAULT_MAX_SAMPLES = 10**6  # Larger sizes only with --max-samples (10^8 needs several GB)
+TAPS = (11, 41, 129, 513)  # 41 is the project's filter (order 40)
+REPEATS = 3  # Best of this many timed runs
+MAX_SAMPLES_PER_METHOD = {'dot': 10**5}  # Per-sample Python loop: larger sizes take minutes
+RELATIVE_TOLERANCE = 1e-9  # Max error relative to the reference's peak value
+REGRESSION_RATIO = 0.8  # --compare flags throughput below this fraction of the baseline
+REPORT_FILE = 'benchmark_report.json'
+SEED = 0
+# ------------------
+
+
+# --- Implementations ---
+# name -> (function(data, coeffs) -> filtered data, reference it is checked against)
+# The repo's saved outputs map to: filtfilt -> filtered_data.txt, direct -> filtered_data_npconvolve.txt,
+# dot -> filtered_data_manual.txt / filtered_data_manual_dot.txt.
+def _filtfilt(data, coeffs):
+    from apply_filter import filter_channels
+    return filter_channels(data, coeffs, method='filtfilt')
+
+
+def _engine(method):
+    return lambda data, coeffs: causal_convolve(data, coeffs, method=method)
+
+
+def _streaming(data, coeffs):
+    fir = StreamingFIRFilter(coeffs, n_channels=data.shape[1])
+    return fir.process(data)
+
+
+IMPLEMENTATIONS = {
+    'filtfilt': (_filtfilt, 'filtfilt'),
+    'dot': (_engine('dot'), 'lfilter'),
+    'strided': (_engine('strided'), 'lfilter'),
+    'direct': (_engine('direct'), 'lfilter'),
+    'fft': (_engine('fft'), 'lfilter'),
+    'symmetric': (_engine('symmetric'), 'lfilter'),
+    'streaming': (_streaming, 'lfilter'),
+}
+# -----------------------
+
+
+def synthetic_signal(n_samples, n_channels=1, fs=FS, seed=SEED):
+    """Accelerometer-like test data: a slow sway, a 10 Hz vibration, noise and sparse spikes."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_samples) / fs
+    data = np.empty((n_samples, n_channels))
+    for channel in range(n_channels):
+        data[:, channel] = (1.5 * np.sin(2 * np.pi * 1.1 * t + channel)
+                            + 2.0 * np.sin(2 * np.pi * 10.1 * t + 0.5 * channel)
+                            + rng.normal(scale=0.8, size=n_samples))
+    spikes = rng.random(data.shape) < 1e-3
+    data[spikes] += rng.normal(scale=6.0, size=np.count_nonzero(spikes))
+    return data
+
+
+def reference_output(kind, data, coeffs):
+    """scipy's lfilter (causal, zero initial state), or for 'filtfilt' a forward-backward lfilter.
+
+    The filtfilt reference is written out rather than calling scipy's filtfilt, which
+    is what the 'filtfilt' implementation itself runs: odd extension by padlen = filter
+    order at both ends, then lfilter forwards and backwards, each started in steady
+    state for its first sample (lfilter_zi), then the padding is cut off again.
+    """
+    from scipy import signal
+    if kind != 'filtfilt':
+        return signal.lfilter(coeffs, 1.0, data, axis=0)
+    padlen = len(coeffs) - 1
+    padded = np.concatenate((2 * data[:1] - data[padlen:0:-1], data, 2 * data[-1:] - data[-2:-padlen - 2:-1]))
+    zi = signal.lfilter_zi(coeffs, 1.0).reshape((-1,) + (1,) * (data.ndim - 1))
+    forward, _ = signal.lfilter(coeffs, 1.0, padded, axis=0, zi=zi * padded[:1])
+    backward, _ = signal.lfilter(coeffs, 1.0, forward[::-1], axis=0, zi=zi * forward[-1:])
+    return backward[::-1][padlen : padlen + len(data)]
+
+
+def time_call(function, data, coeffs, repeats=REPEATS):
+    """Best wall time over repeats; returns (seconds, last output)."""
+    # Untimed warm-up on a short slice: lazy imports and first-call setup are not measured
+    function(data[:1000], coeffs)
+    best = np.inf
+    output = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        output = function(data, coeffs)
+        best = min(best, time.perf_counter() - started)
+    return best, output
+
+
+def peak_memory(function, data, coeffs):
+    """Peak bytes allocated during one call (tracemalloc also sees numpy buffers)."""
+    tracemalloc.start()
+    try:
+        function(data, coeffs)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_benchmarks(sizes, taps, methods, n_channels=1, repeats=REPEATS):
+    """Times every method on every (size, taps) case; returns the list of result rows."""
+    rows = []
+    for n_samples in sizes:
+        data = synthetic_signal(n_samples, n_channels)
+        for numtaps in taps:
+            coeffs = design_lowpass(FS, CUTOFF_FREQ, numtaps)
+            references = {}
+            for method in methods:
+                function, reference_kind = IMPLEMENTATIONS[method]
+                row = {'method': method, 'n_samples': n_samples, 'numtaps': numtaps,
+                       'n_channels': n_channels, 'reference': reference_kind}
+                limit = MAX_SAMPLES_PER_METHOD.get(method)
+                if limit is not None and n_samples > limit:
+                    row['status'] = 'skipped'
+                    rows.append(row)
+                    continue
+
+                seconds, output = time_call(function, data, coeffs, repeats)
+                if reference_kind not in references:
+                    references[reference_kind] = reference_output(reference_kind, data, coeffs)
+                reference = references[reference_kind]
+                error = float(np.max(np.abs(output - reference))) if n_samples else 0.0
+                scale = max(float(np.max(np.abs(reference))), 1e-300)
+                del output
+
+                row.update({
+                    'status': 'ok' if error <= RELATIVE_TOLERANCE * scale else 'mismatch',
+                    'seconds': seconds,
+                    'samples_per_sec': n_samples / seconds if seconds > 0 else float('inf'),
+                    'peak_memory_mb': peak_memory(function, data, coeffs) / 2**20,
+                    'max_abs_error': error,
+                    'relative_error': error / scale,
+                })
+                rows.append(row)
+                print(f"{method:>10} n={n_samples:>10} taps={numtaps:>4}: {seconds * 1e3:10.3f} ms "
+                      f"{row['samples_per_sec']:12.4g} samples/s {row['peak_memory_mb']:9.2f} MB "
+                      f"err={row['relative_error']:.1e} {row['status']}")
+            del references
+    return rows
+
+
+def environment_info():
+    import scipy
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'scipy': scipy.__version__,
+        'machine': platform.machine(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def compare_reports(rows, baseline_path, ratio=REGRESSION_RATIO):
+    """Rows whose throughput fell below ratio x the baseline's for the same case."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    key = lambda row: (row['method'], row['n_samples'], row['numtaps'], row.get('n_channels', 1))
+    previous = {key(row): row for row in baseline['results'] if row.get('status') == 'ok'}
+    regressions = []
+    for row in rows:
+        old = previous.get(key(row))
+        if row.get('status') == 'ok' and old is not None and row['samples_per_sec'] < ratio * old['samples_per_sec']:
+            regressions.append((row, old))
+    return regressions
+
+
+def parse_list(value, convert=int):
+    return [convert(item) for item in value.split(',') if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the filtering implementations for speed, memory and accuracy.')
+    parser.add_argument('--max-samples', type=float, default=DEFAULT_MAX_SAMPLES,
+                        help=f'Largest signal length from 10^{SIZE_EXPONENTS[0]}..10^{SIZE_EXPONENTS[-1]} '
+                             f'(default: {DEFAULT_MAX_SAMPLES:.0e}).')
+    parser.add_argument('--taps', type=parse_list, default=list(TAPS),
+                        help=f"Comma-separated tap counts (default: {','.join(map(str, TAPS))}).")
+    parser.add_argument('--methods', type=lambda value: parse_list(value, str), default=list(IMPLEMENTATIONS),
+                        help=f"Comma-separated methods (default: {','.join(IMPLEMENTATIONS)}).")
+    parser.add_argument('--channels', type=int, default=1, help='Channels per signal (default: 1).')
+    parser.add_argument('--repeats', type=int, default=REPEATS, help=f'Timed runs per case (default: {REPEATS}).')
+    parser.add_argument('--output', default=REPORT_FILE, help=f'JSON report (default: {REPORT_FILE}).')
+    parser.add_argument('--compare', default=None, help='Baseline JSON report to check for throughput regressions.')
+    args = parser.parse_args()
+
+    unknown = [method for method in args.methods if method not in IMPLEMENTATIONS]
+    if unknown:
+        print(f"Error: Unknown method(s) {unknown}; choose from {', '.join(IMPLEMENTATIONS)}.")
+        sys.exit(1)
+    sizes = [10**exponent for exponent in SIZE_EXPONENTS if 10**exponent <= args.max_samples]
+
+    print(f"Benchmarking {', '.join(args.methods)} on {len(sizes)} sizes x {len(args.taps)} tap counts...")
+    rows = run_benchmarks(sizes, args.taps, args.methods, args.channels, args.repeats)
+    report = {'environment': environment_info(),
+              'settings': {'fs': FS, 'cutoff': CUTOFF_FREQ, 'repeats': args.repeats,
+                           'relative_tolerance': RELATIVE_TOLERANCE},
+              'results': rows}
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=1)
+    print(f"Report saved to {args.output}")
+
+    failed = [row for row in rows if row['status'] == 'mismatch']
+    for row in failed:
+        print(f"MISMATCH {row['method']} n={row['n_samples']} taps={row['numtaps']}: "
+              f"relative error {row['relative_error']:.2e} vs {row['reference']}")
+    regressions = compare_reports(rows, args.compare) if args.compare else []
+    for row, old in regressions:
+        print(f"REGRESSION {row['method']} n={row['n_samples']} taps={row['numtaps']}: "
+              f"{row['samples_per_sec']:.4g} samples/s (baseline {old['samples_per_sec']:.4g})")
+    if failed or regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from data_io import as_float_array
+
+# --- Parameters ---
+CONVOLUTION_METHODS = ('auto', 'dot', 'strided', 'direct', 'fft', 'symmetric')
+FFT_MIN_TAPS = 128  # 'auto' switches to overlap-add FFT above this many taps...
+FFT_MIN_SAMPLES = 4096  # ...when the signal is at least this long
+STRIDED_BLOCK_ROWS = 65536  # Output samples per sliding-window matmul block
+SYMMETRIC_BLOCK_ROWS = 16384  # Output samples per pre-add pass (keeps the operands in cache)
+SYMMETRIC_MIN_ROWS_PER_TAP = 64  # Below this many outputs per tap, a BLAS matmul beats the pre-add loop
+SYMMETRY_TOLERANCE = 1e-12  # Max |h[k] - h[N-1-k]|, relative to the largest tap
+# ------------------
+
+
+# Every engine fills out, an array shaped like data, and returns it.
+def _convolve_dot(data, coeffs, out):
+    """Reference implementation: one np.dot per output sample."""
+    n_data = len(data)
+    n_coeffs = len(coeffs)
+    output = out
+    # Reverse coefficients once for dot product usage
+    coeffs_rev = coeffs[::-1]
+    # Pad the beginning of the data with zeros for handling initial samples
+    padded_data = np.pad(data, [(n_coeffs - 1, 0)] + [(0, 0)] * (data.ndim - 1), 'constant')
+    for n in range(n_data):
+        # The slice corresponds to data[n-k] for k=0..n_coeffs-1
+        output[n] = np.dot(coeffs_rev, padded_data[n : n + n_coeffs])
+    return output
+
+
+def _convolve_strided(data, coeffs, out):
+    """Sliding-window view of the padded input times the reversed coefficients."""
+    n_data = len(data)
+    n_coeffs = len(coeffs)
+    output = out
+    coeffs_rev = np.ascontiguousarray(coeffs[::-1])
+    padded_data = np.pad(data, [(n_coeffs - 1, 0)] + [(0, 0)] * (data.ndim - 1), 'constant')
+    windows = sliding_window_view(padded_data, n_coeffs, axis=0)
+    # Work in blocks so the matmul never materialises more than BLOCK x taps values per channel
+    for start in range(0, n_data, STRIDED_BLOCK_ROWS):
+        stop = min(start + STRIDED_BLOCK_ROWS, n_data)
+        np.matmul(windows[start:stop], coeffs_rev, out=output[start:stop])
+    return output
+
+
+def symmetric_taps(coeffs):
+    """First ceil(N/2) taps of a linear-phase (symmetric) filter, or None if coeffs are not symmetric."""
+    coeffs = as_float_array(coeffs)
+    scale = np.max(np.abs(coeffs)) if len(coeffs) else 0.0
+    if np.max(np.abs(coeffs - coeffs[::-1]), initial=0.0) > SYMMETRY_TOLERANCE * scale:
+        return None
+    return np.ascontiguousarray(coeffs[:(len(coeffs) + 1) // 2])
+
+
+def convolve_symmetric_window(window, taps, n_coeffs, out, scratch=None):
+    """out[j] = sum_k h[k] * window[j + N-1 - k] for a symmetric filter h of N = n_coeffs taps.
+
+    window holds N-1 samples of history followed by len(out) new ones (along axis 0) and
+    taps is symmetric_taps(h). Since h[k] == h[N-1-k], the two samples sharing a tap are
+    added first, so each output costs ceil(N/2) multiplies instead of N. scratch is an
+    optional buffer shaped like out for the pre-added pairs.
+    """
+    n = len(out)
+    half = n_coeffs // 2
+    if n == 1:
+        # Single sample (streaming): fold the window onto itself
+        folded = window[:half] + window[n_coeffs - 1 : n_coeffs - 1 - half : -1]
+        out[0] = np.matmul(taps[:half], folded)
+        if n_coeffs % 2:
+            out[0] += taps[half] * window[half]
+        return out
+    if scratch is None:
+        scratch = np.empty(out.shape, dtype=out.dtype)
+    if n_coeffs % 2:
+        np.multiply(window[half : half + n], taps[half], out=out)  # Middle tap has no partner
+    else:
+        out.fill(0.0)
+    for k in range(half):
+        np.add(window[k : k + n], window[n_coeffs - 1 - k : n_coeffs - 1 - k + n], out=scratch)
+        scratch *= taps[k]
+        out += scratch
+    return out
+
+
+def prefers_symmetric(n_data, n_coeffs):
+    """Whether convolve_symmetric_window() is faster than a sliding-window matmul for this block.
+
+    The pre-add loop makes a few array calls per tap pair, so it only pays off for single
+    samples and for blocks that are long compared with the filter.
+    """
+    return n_data == 1 or n_data >= SYMMETRIC_MIN_ROWS_PER_TAP * n_coeffs
+
+
+def _convolve_symmetric(data, coeffs, out):
+    """Linear-phase FIR: mirrored samples are pre-added, halving the multiplies per output."""
+    taps = symmetric_taps(coeffs)
+    if taps is None:
+        raise ValueError("The 'symmetric' method needs symmetric (linear-phase) coefficients.")
+    n_data = len(data)
+    n_coeffs = len(coeffs)
+    output = out
+    padded_data = np.pad(data, [(n_coeffs - 1, 0)] + [(0, 0)] * (data.ndim - 1), 'constant')
+    scratch = np.empty((min(n_data, SYMMETRIC_BLOCK_ROWS),) + data.shape[1:], dtype=data.dtype)
+    for start in range(0, n_data, SYMMETRIC_BLOCK_ROWS):
+        stop = min(start + SYMMETRIC_BLOCK_ROWS, n_data)
+        convolve_symmetric_window(padded_data[start : stop + n_coeffs - 1], taps, n_coeffs,
+                                  output[start:stop], scratch[:stop - start])
+    return output
+
+
+def _convolve_direct(data, coeffs, out):
+    """np.convolve in 'full' mode, truncated to the causal part (per channel)."""
+    if data.ndim == 1:
+        out[:] = np.convolve(data, coeffs)[:len(data)]
+        return out
+    for channel in range(data.shape[1]):
+        out[:, channel] = np.convolve(data[:, channel], coeffs)[:len(data)]
+    return out
+
+
+def _convolve_fft(data, coeffs, out):
+    """Overlap-add FFT convolution, truncated to the causal part."""
+    n_data = len(data)
+    n_coeffs = len(coeffs)
+    channel_shape = data.shape[1:]
+    # FFT size: a power of two comfortably larger than the filter
+    nfft = 1 << int(np.ceil(np.log2(8 * n_coeffs)))
+    block_len = nfft - n_coeffs + 1
+    n_blocks = -(-n_data // block_len)
+
+    blocks = np.zeros((n_blocks * block_len,) + channel_shape, dtype=data.dtype)
+    blocks[:n_data] = data
+    blocks = blocks.reshape((n_blocks, block_len) + channel_shape)
+    coeffs_fft = np.fft.rfft(coeffs, nfft).reshape((-1,) + (1,) * len(channel_shape))
+    block_out = np.fft.irfft(np.fft.rfft(blocks, nfft, axis=1) * coeffs_fft, nfft, axis=1)
+
+    # Add every block's tail onto the blocks that follow it
+    n_parts = -(-nfft // block_len)
+    block_out = np.pad(block_out, [(0, 0), (0, n_parts * block_len - nfft)] + [(0, 0)] * len(channel_shape))
+    block_out = block_out.reshape((n_blocks, n_parts, block_len) + channel_shape)
+    output = np.zeros((n_blocks + n_parts - 1, block_len) + channel_shape, dtype=data.dtype)
+    for part in range(n_parts):
+        output[part : part + n_blocks] += block_out[:, part]
+    out[:] = output.reshape((-1,) + channel_shape)[:n_data]
+    return out
+
+
+_ENGINES = {
+    'dot': _convolve_dot,
+    'strided': _convolve_strided,
+    'direct': _convolve_direct,
+    'fft': _convolve_fft,
+    'symmetric': _convolve_symmetric,
+}
+
+
+def select_method(n_data, n_coeffs):
+    """Picks the fastest engine for a given signal length and tap count."""
+    if n_coeffs > FFT_MIN_TAPS and n_data >= FFT_MIN_SAMPLES:
+        return 'fft'
+    return 'direct'
+
+
+def causal_convolve(data, coeffs, method='auto', axis=0, out=None):
+    """Causal FIR filtering: output[n] = sum_k coeffs[k] * data[n - k], zero initial state.
+
+    data may be 1-D or N-D; every 1-D slice along axis is filtered in one call.
+    method is one of CONVOLUTION_METHODS; 'auto' chooses by tap count and signal length.
+    float32 data is filtered in float32 (compact mode), anything else in float64. out is
+    an optional preallocated array shaped like data to write the result into.
+    """
+    data = as_float_array(data)
+    coeffs = np.asarray(coeffs, dtype=data.dtype)
+    if method == 'auto':
+        method = select_method(data.shape[axis] if data.ndim else 0, len(coeffs))
+    if method not in _ENGINES:
+        raise ValueError(f"Unknown convolution method '{method}'. Choose from {CONVOLUTION_METHODS}.")
+    if data.ndim == 0:
+        raise ValueError("data must be at least 1-D.")
+    if out is None:
+        out = np.empty(data.shape, dtype=data.dtype)
+    elif out.shape != data.shape:
+        raise ValueError(f"out has shape {out.shape}, expected {data.shape}.")
+    if data.shape[axis] == 0:
+        return out
+
+    # Engines work on (n_samples,) or (n_samples, n_channels) arrays
+    moved = np.moveaxis(data, axis, 0)
+    moved_out = np.moveaxis(out, axis, 0)
+    if moved.ndim <= 2 and moved_out.dtype == data.dtype:
+        _ENGINES[method](moved, coeffs, moved_out)  # Written in place
+    else:
+        flat = moved if moved.ndim <= 2 else moved.reshape(moved.shape[0], -1)
+        moved_out[...] = _ENGINES[method](flat, coeffs, np.empty(flat.shape, dtype=data.dtype)).reshape(moved.shape)
+    return out
@@ -0,0 +1,318 @@
+import numpy as np
+import io
+import json
+import os
+
+# --- Parameters ---
+BINARY_EXTENSION = '.f64'  # Binary table files; anything else is tab-separated text
+BINARY_MAGIC = b'PSLTAB\x01\x00'  # 8-byte magic + format version
+HEADER_ALIGN = 64  # Data starts at a multiple of this many bytes
+TEXT_FLOAT_FORMAT = '%.9f'  # Same precision every script used for its text output
+LOG_COLUMNS = ('x', 'y', 'time', 'xaccel', 'yaccel')  # Raw logger layout (time holds deltas)
+LOG_BLOCK_BYTES = 16 * 2**20  # load_log parses the file in blocks of about this size
+# ------------------
+#
+# pandas is only imported for text tables, so binary-only runs never load it.
+#
+# Binary layout: magic (8 bytes) | header length (uint32 LE) | JSON header padded with
+# spaces | float64 LE values, row-major (n_rows, n_columns). The row count is implied by
+# the file size, so a writer can keep appending rows while streaming.
+
+
+def is_binary(path):
+    """True if path uses the binary table format (decided by extension)."""
+    return os.path.splitext(str(path))[1].lower() == BINARY_EXTENSION
+
+
+def text_export_path(path):
+    """The .txt file a binary table is exported to (e.g. resampled_data.f64 -> resampled_data.txt)."""
+    return os.path.splitext(str(path))[0] + '.txt'
+
+
+def segments_path(path):
+    """Segment metadata written next to a gap-aware resampled table (resampled_data_segments.f64)."""
+    root, extension = os.path.splitext(str(path))
+    return root + '_segments' + extension
+
+
+def load_segments(path):
+    """Segment metadata of the table at path, or None if it was resampled without gap detection."""
+    metadata_path = segments_path(path)
+    if not os.path.exists(metadata_path):
+        return None
+    table = load_table(metadata_path, mmap=False)
+    table['first_row'] = table['first_row'].astype(np.int64)
+    table['n_rows'] = table['n_rows'].astype(np.int64)
+    return table
+
+
+def _encode_header(columns):
+    header = json.dumps({'columns': list(columns), 'dtype': '<f8'}).encode('utf-8')
+    prefix_len = len(BINARY_MAGIC) + 4
+    total = -(-(prefix_len + len(header)) // HEADER_ALIGN) * HEADER_ALIGN
+    header = header.ljust(total - prefix_len, b' ')
+    return BINARY_MAGIC + np.uint32(len(header)).astype('<u4').tobytes() + header
+
+
+def _read_header(path):
+    """Returns (column names, data offset) of a binary table."""
+    with open(path, 'rb') as f:
+        magic = f.read(len(BINARY_MAGIC))
+        if magic != BINARY_MAGIC:
+            raise ValueError(f"'{path}' is not a binary table file.")
+        header_len = int(np.frombuffer(f.read(4), dtype='<u4')[0])
+        header = json.loads(f.read(header_len).decode('utf-8'))
+    return header['columns'], len(BINARY_MAGIC) + 4 + header_len
+
+
+def as_float_array(values):
+    """values as a float array: float32 stays float32 (compact mode), anything else becomes float64."""
+    values = np.asarray(values)
+    return values if values.dtype == np.float32 else values.astype(np.float64, copy=False)
+
+
+def _as_columns(table):
+    """Accepts a dict of columns or a DataFrame; returns an ordered dict of 1-D arrays."""
+    if hasattr(table, 'columns') and hasattr(table, 'to_numpy'):  # DataFrame, without importing pandas
+        return {name: table[name].to_numpy() for name in table.columns}
+    return {name: np.asarray(values) for name, values in table.items()}
+
+
+class TableWriter:
+    """Appends blocks of rows to a binary or text table, writing the header once.
+
+    append=True continues an existing table with the same columns instead of replacing
+    it (a partial last row of a binary table, e.g. from a crash, is dropped). n_rows
+    counts the rows written through this writer.
+    """
+
+    def __init__(self, path, columns, append=False):
+        self.path = path
+        self.columns = list(columns)
+        self.binary = is_binary(path)
+        self.n_rows = 0
+        existing = append and os.path.exists(path) and os.path.getsize(path) > 0
+        if existing and self.binary:
+            names, offset = _read_header(path)
+            if names != self.columns:
+                raise ValueError(f"'{path}' has columns {names}, expected {self.columns}.")
+            row_bytes = 8 * len(names)
+            self._file = open(path, 'r+b')
+            self._file.truncate(offset + (os.path.getsize(path) - offset) // row_bytes * row_bytes)
+            self._file.seek(0, os.SEEK_END)
+        elif self.binary:
+            self._file = open(path, 'wb')
+            self._file.write(_encode_header(self.columns))
+        else:
+            self._file = open(path, 'a' if existing else 'w', newline='')
+        self._needs_header = not self.binary and not existing
+
+    def write(self, table):
+        """Appends rows given as a dict of equal-length columns (or a DataFrame)."""
+        table = _as_columns(table)
+        if list(table) != self.columns:
+            raise ValueError(f"Expected columns {self.columns}, got {list(table)}.")
+        n_rows = len(next(iter(table.values()))) if table else 0
+        if self.binary:
+            block = np.empty((n_rows, len(self.columns)), dtype='<f8')
+            for j, name in enumerate(self.columns):
+                block[:, j] = table[name]
+            block.tofile(self._file)
+        else:
+            import pandas as pd
+            pd.DataFrame(table, columns=self.columns).to_csv(
+                self._file, sep='\t', index=False, float_format=TEXT_FLOAT_FORMAT,
+                header=self._needs_header)
+            self._needs_header = False
+        self.n_rows += n_rows
+
+    def close(self):
+        if not self._file.closed:
+            if self._needs_header:
+                # Text tables always get a header line, even when empty
+                self._file.write('\t'.join(self.columns) + '\n')
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def save_table(path, table):
+    """Writes a whole table (dict of columns or DataFrame); format chosen by extension."""
+    table = _as_columns(table)
+    with TableWriter(path, table.keys()) as writer:
+        writer.write(table)
+
+
+def load_table(path, columns=None, mmap=True):
+    """Reads a binary or text table into a dict of 1-D float arrays (column name -> array).
+
+    Binary tables are memory-mapped by default, so each column is a zero-copy view.
+    columns restricts the result to the named columns.
+    """
+    if not is_binary(path):
+        import pandas as pd
+        df = pd.read_csv(path, sep='\t', header=0, usecols=columns)
+        names = columns if columns is not None else list(df.columns)
+        return {name: df[name].to_numpy() for name in names}
+
+    names, offset = _read_header(path)
+    n_values = (os.path.getsize(path) - offset) // 8
+    n_rows = n_values // len(names) if names else 0
+    if mmap and n_rows > 0:
+        values = np.memmap(path, dtype='<f8', mode='r', offset=offset, shape=(n_rows, len(names)))
+    else:
+        values = np.fromfile(path, dtype='<f8', count=n_rows * len(names), offset=offset)
+        values = values.reshape(n_rows, len(names))
+    missing = [name for name in (columns or []) if name not in names]
+    if missing:
+        raise KeyError(f"Columns {missing} not found in '{path}'.")
+    return {name: values[:, names.index(name)] for name in (columns or names)}
+
+
+def iter_table(path, columns=None, block_rows=100000):
+    """Yields a table in blocks of up to block_rows rows (dicts of column arrays).
+
+    Binary tables are sliced from a memory map and text tables read with pandas'
+    chunksize, so memory use is bounded by the block size whatever the file length.
+    """
+    if not is_binary(path):
+        import pandas as pd
+        for chunk in pd.read_csv(path, sep='\t', header=0, usecols=columns, chunksize=block_rows):
+            names = columns if columns is not None else list(chunk.columns)
+            yield {name: chunk[name].to_numpy() for name in names}
+        return
+
+    table = load_table(path, columns=columns, mmap=True)
+    n_rows = len(next(iter(table.values()))) if table else 0
+    for start in range(0, n_rows, block_rows):
+        yield {name: np.asarray(values[start : start + block_rows]) for name, values in table.items()}
+
+
+# --- Raw Logger Files ---
+def _parse_log_lines(block, first_line, n_fields, usecols, bad_lines):
+    """Slow path for a block with malformed lines: parses line by line, recording the bad ones."""
+    rows = []
+    for offset, line in enumerate(block.split(b'\n')):
+        if not line.strip():
+            continue
+        fields = line.split(b'\t')
+        if len(fields) != n_fields:
+            bad_lines.append((first_line + offset, f"expected {n_fields} fields, got {len(fields)}",
+                              line.decode('utf-8', 'replace').rstrip()))
+            continue
+        try:
+            rows.append([float(fields[j]) for j in usecols])
+        except ValueError:
+            bad_lines.append((first_line + offset, "non-numeric value",
+                              line.decode('utf-8', 'replace').rstrip()))
+    values = np.array(rows, dtype=np.float64).reshape(-1, len(usecols))
+    return [np.ascontiguousarray(values[:, j]) for j in range(len(usecols))]
+
+
+def _parse_log_columns(block, first_line, n_fields, usecols, n_lines=None):
+    """Parses one block of log lines; returns (one float64 array per usecols entry, bad_lines)."""
+    import pandas as pd
+    bad_lines = []
+    if n_lines is None:
+        n_lines = block.count(b'\n') + (0 if block.endswith(b'\n') else 1)
+    if block.count(b'\t') == (n_fields - 1) * n_lines:
+        try:
+            # pandas' C tokenizer, reading only the needed columns straight into float64
+            df = pd.read_csv(io.BytesIO(block), sep='\t', header=None, usecols=usecols, dtype=np.float64,
+                             engine='c', na_filter=False)
+            if len(df) == n_lines:  # Otherwise blank lines were skipped: use the slow path
+                return [df[j].to_numpy() for j in usecols], bad_lines
+        except ValueError:  # Also covers pandas' ParserError
+            pass
+    return _parse_log_lines(block, first_line, n_fields, usecols, bad_lines), bad_lines
+
+
+def parse_log_block(block, first_line, n_fields, usecols):
+    """Parses one block of log lines; returns (values (n, len(usecols)), bad_lines)."""
+    columns, bad_lines = _parse_log_columns(block, first_line, n_fields, usecols)
+    return np.column_stack(columns) if columns else np.empty((0, 0)), bad_lines
+
+
+def _read_log_header(f, path, columns):
+    """Reads the header line of an open raw log; returns (n_fields, columns, usecols)."""
+    header = f.readline().decode('utf-8').rstrip('\r\n').split('\t')
+    columns = list(header) if columns is None else list(columns)
+    missing = [name for name in columns if name not in header]
+    if missing:
+        raise KeyError(f"Columns {missing} not found in '{path}'.")
+    return len(header), columns, [header.index(name) for name in columns]
+
+
+def _log_blocks(f, block_bytes):
+    """Yields (block, first line number, line count) of line-aligned blocks of about block_bytes from an open log."""
+    line_number = 2  # 1-based, after the header
+    carry = b''
+    while True:
+        chunk = f.read(block_bytes)
+        if not chunk:
+            break
+        end = chunk.rfind(b'\n') + 1
+        if end == 0:  # No line end in this chunk yet
+            carry += chunk
+            continue
+        block = carry + chunk[:end]
+        carry = chunk[end:]
+        n_lines = block.count(b'\n')
+        yield block, line_number, n_lines
+        line_number += n_lines
+    if carry:
+        yield carry, line_number, 1
+
+
+def iter_log(path, columns=None, block_bytes=LOG_BLOCK_BYTES):
+    """Yields (table, bad_lines) for each line-aligned block of a raw log, in file order.
+
+    table maps each requested column (default: all) to a float64 array. Only one block
+    is held in memory; load_log uses the same parser, so streaming readers and
+    whole-file loads give bit-identical values.
+    """
+    with open(path, 'rb') as f:
+        n_fields, columns, usecols = _read_log_header(f, path, columns)
+        for block, first_line, n_lines in _log_blocks(f, block_bytes):
+            values, bad_lines = _parse_log_columns(block, first_line, n_fields, usecols, n_lines)
+            yield dict(zip(columns, values)), bad_lines
+
+
+def load_log(path, columns=None, block_bytes=LOG_BLOCK_BYTES):
+    """Loader for tab-separated raw logs (LOG_COLUMNS layout, one header line).
+
+    Returns (table, bad_lines): table maps each requested column (default: all) to a
+    contiguous float64 array, and bad_lines lists (line_number, reason, text) for the
+    lines that were skipped. The file is read in blocks, each parsed by pandas' C
+    tokenizer reading only the needed columns; a block whose tab count shows a wrong
+    field count, or that fails to parse, is redone line by line so one bad line never
+    stops the load. Raw blocks are dropped as soon as they are parsed.
+    """
+    parts = []
+    bad_lines = []
+    for table, block_bad in iter_log(path, columns, block_bytes):
+        parts.append(table)
+        bad_lines.extend(block_bad)
+    if len(parts) == 1:
+        return parts[0], bad_lines
+    if not parts:
+        with open(path, 'rb') as f:
+            columns = _read_log_header(f, path, columns)[1]
+        return {name: np.empty(0) for name in columns}, bad_lines
+    return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}, bad_lines
+
+
+def report_bad_lines(path, bad_lines, limit=5):
+    """Prints a short warning about the lines load_log skipped."""
+    if not bad_lines:
+        return
+    print(f"Warning: skipped {len(bad_lines)} malformed line(s) in '{path}':")
+    for line_number, reason, text in bad_lines[:limit]:
+        print(f"  line {line_number}: {reason}: {text[:80]!r}")
+    if len(bad_lines) > limit:
+        print(f"  ... and {len(bad_lines) - limit} more.")
+# ------------------------
@@ -0,0 +1,198 @@
+import numpy as np
+from functools import lru_cache
+import hashlib
+import os
+
+# --- Parameters ---
+DESIGN_CACHE_SIZE = 256  # Designs / responses kept in memory (least recently used are dropped)
+FREQZ_POINTS = 8000  # Default number of frequency-response points (as in analyze_filter.py)
+DISK_CACHE_ENV = 'FILTER_CACHE_DIR'  # Set to a directory to persist designs across runs
+# ------------------
+
+_disk_cache_dir = os.environ.get(DISK_CACHE_ENV) or None
+
+
+def set_disk_cache_dir(directory):
+    """Enables the on-disk cache in directory (None disables it)."""
+    global _disk_cache_dir
+    _disk_cache_dir = directory
+
+
+def _disk_cache_path(kind, key):
+    if _disk_cache_dir is None:
+        return None
+    digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:20]
+    return os.path.join(_disk_cache_dir, f'{kind}_{digest}.npz')
+
+
+def _disk_load(kind, key):
+    path = _disk_cache_path(kind, key)
+    if path is None or not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as stored:
+            # Guard against hash collisions by checking the stored key
+            if str(stored['key']) != repr(key):
+                return None
+            return {name: stored[name] for name in stored.files if name != 'key'}
+    except Exception:
+        return None  # A corrupt cache entry is simply recomputed
+
+
+def _disk_store(kind, key, **arrays):
+    path = _disk_cache_path(kind, key)
+    if path is None:
+        return
+    try:
+        os.makedirs(_disk_cache_dir, exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, key=np.array(repr(key)), **arrays)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Warning: could not write filter cache entry {path}: {e}")
+
+
+def _read_only(array):
+    array.setflags(write=False)
+    return array
+
+
+@lru_cache(maxsize=DESIGN_CACHE_SIZE)
+def _cached_lowpass(fs, cutoff, numtaps, window):
+    key = ('lowpass', fs, cutoff, numtaps, window)
+    stored = _disk_load('lowpass', key)
+    if stored is not None:
+        return _read_only(stored['coeffs'])
+
+    from scipy import signal  # Only needed on a cache miss
+    # Normalize cutoff frequency to Nyquist frequency (fs/2)
+    nyquist = fs / 2.0
+    normalized_cutoff = cutoff / nyquist
+    coeffs = signal.firwin(numtaps, normalized_cutoff, window=window, pass_zero='lowpass')
+    _disk_store('lowpass', key, coeffs=coeffs)
+    return _read_only(coeffs)
+
+
+def design_lowpass(fs, cutoff, numtaps, window='hamming'):
+    """Designs the FIR low-pass used throughout the project (firwin, cutoff normalized to Nyquist).
+
+    Results are memoized by (fs, cutoff, numtaps, window); the returned array is read-only.
+    """
+    if isinstance(window, list):
+        window = tuple(window)  # e.g. ['kaiser', 8.0] -> hashable
+    return _cached_lowpass(float(fs), float(cutoff), int(numtaps), window)
+
+
+@lru_cache(maxsize=DESIGN_CACHE_SIZE)
+def _cached_response(fs, cutoff, numtaps, window, worN):
+    key = ('freqz', fs, cutoff, numtaps, window, worN)
+    stored = _disk_load('freqz', key)
+    if stored is not None:
+        return _read_only(stored['w']), _read_only(stored['h'])
+
+    from scipy import signal
+    w, h = signal.freqz(_cached_lowpass(fs, cutoff, numtaps, window), worN=worN)
+    _disk_store('freqz', key, w=w, h=h)
+    return _read_only(w), _read_only(h)
+
+
+def frequency_response(fs, cutoff, numtaps, window='hamming', worN=FREQZ_POINTS):
+    """signal.freqz of design_lowpass(fs, cutoff, numtaps, window), memoized the same way.
+
+    Returns (w, h) with w in radians/sample, as signal.freqz does; both arrays are read-only.
+    """
+    if isinstance(window, list):
+        window = tuple(window)
+    return _cached_response(float(fs), float(cutoff), int(numtaps), window, int(worN))
+
+
+def clear_cache():
+    """Empties the in-memory caches (the on-disk cache is left alone)."""
+    _cached_lowpass.cache_clear()
+    _cached_response.cache_clear()
+
+
+# --- Design Sweep ---
+def batched_response(coeff_list, n_fft=2 * FREQZ_POINTS):
+    """Frequency responses of many FIR designs with one batched rfft.
+
+    The coefficient vectors are zero-padded into an (n_designs, n_fft) matrix. Returns
+    (w, H, group_delay): w in radians/sample (0..pi), H complex (n_designs, n_fft//2 + 1)
+    and the group delay in samples, from the same FFT of the tap-index-weighted taps.
+    """
+    max_taps = max(len(coeffs) for coeffs in coeff_list)
+    if n_fft < max_taps:
+        raise ValueError(f"n_fft ({n_fft}) must be at least the longest filter ({max_taps} taps).")
+    matrix = np.zeros((2 * len(coeff_list), n_fft), dtype=np.float64)
+    for i, coeffs in enumerate(coeff_list):
+        matrix[i, :len(coeffs)] = coeffs
+        matrix[len(coeff_list) + i, :len(coeffs)] = np.arange(len(coeffs)) * coeffs
+    spectra = np.fft.rfft(matrix, axis=1)
+    H, H_weighted = spectra[:len(coeff_list)], spectra[len(coeff_list):]
+    # Group delay: Re(DFT(n h[n]) / DFT(h[n])); undefined where the response vanishes
+    with np.errstate(divide='ignore', invalid='ignore'):
+        group_delay = np.real(H_weighted / H)
+    w = np.linspace(0, np.pi, n_fft // 2 + 1)
+    return w, H, group_delay
+
+
+def sweep_designs(fs, taps_grid, windows, cutoffs, passband_ratio=0.8, stopband_ratio=1.2,
+                  n_fft=2 * FREQZ_POINTS):
+    """Evaluates every (numtaps, window, cutoff) low-pass design in one batched FFT.
+
+    Passband is 0..passband_ratio*cutoff and stopband stopband_ratio*cutoff..fs/2, as in
+    analyze_filter.py. Returns a table (dict of columns) with passband ripple (dB),
+    maximum stopband gain (dB, i.e. minus the minimum attenuation) and the group delay.
+    """
+    designs = [(int(numtaps), window, float(cutoff))
+               for numtaps in taps_grid for window in windows for cutoff in cutoffs]
+    if not designs:
+        raise ValueError("The sweep grid is empty.")
+    coeff_list = [design_lowpass(fs, cutoff, numtaps, window) for numtaps, window, cutoff in designs]
+    w, H, group_delay = batched_response(coeff_list, n_fft)
+
+    frequencies_hz = w / np.pi * (fs / 2.0)
+    with np.errstate(divide='ignore'):
+        magnitude_db = 20 * np.log10(np.abs(H))
+    cutoff_hz = np.array([cutoff for _, _, cutoff in designs])[:, np.newaxis]
+    passband = frequencies_hz[np.newaxis, :] <= passband_ratio * cutoff_hz
+    stopband = frequencies_hz[np.newaxis, :] >= stopband_ratio * cutoff_hz
+
+    # Masked max / min over each row; rows with an empty band come out as NaN
+    with np.errstate(invalid='ignore'):
+        max_passband_db = np.where(passband, magnitude_db, -np.inf).max(axis=1)
+        min_passband_db = np.where(passband, magnitude_db, np.inf).min(axis=1)
+        max_stopband_db = np.where(stopband, magnitude_db, -np.inf).max(axis=1)
+        passband_ripple_db = max_passband_db - min_passband_db
+        delay_samples = np.nanmedian(np.where(passband, group_delay, np.nan), axis=1)
+    passband_ripple_db[~passband.any(axis=1)] = np.nan
+    max_stopband_db[~stopband.any(axis=1)] = np.nan
+
+    return {
+        'numtaps': np.array([numtaps for numtaps, _, _ in designs]),
+        'window': [str(window) for _, window, _ in designs],
+        'cutoff_hz': cutoff_hz[:, 0],
+        'passband_ripple_db': passband_ripple_db,
+        'max_stopband_gain_db': max_stopband_db,
+        'group_delay_samples': delay_samples,
+        'group_delay_sec': delay_samples / fs,
+    }
+
+
+def cheapest_design(sweep, max_ripple_db, min_attenuation_db, cutoff=None):
+    """Index of the design with the fewest taps meeting the spec, or None.
+
+    The spec is passband ripple <= max_ripple_db and stopband gain <= -min_attenuation_db;
+    ties are broken by the larger attenuation. cutoff restricts the search to one cutoff.
+    """
+    ok = (sweep['passband_ripple_db'] <= max_ripple_db) & \
+         (sweep['max_stopband_gain_db'] <= -abs(min_attenuation_db))
+    if cutoff is not None:
+        ok &= np.isclose(sweep['cutoff_hz'], cutoff)
+    candidates = np.flatnonzero(ok)
+    if len(candidates) == 0:
+        return None
+    order = np.lexsort((sweep['max_stopband_gain_db'][candidates], sweep['numtaps'][candidates]))
+    return int(candidates[order[0]])
+# ----------------------
@@ -0,0 +1,228 @@
+import numpy as np
+import argparse
+import sys
+
+from data_io import iter_table, TableWriter
+
+# --- Parameters ---
+INPUT_FILE = 'resampled_data.f64'
+OUTPUT_FILE = 'live_frequency_track.f64'  # Per-sample dominant frequency / magnitude
+FS = 50.0  # Sampling frequency (Hz)
+CHANNELS = ['xaccel', 'yaccel']
+WINDOW_LEN = 64  # Sliding window length N (frequency resolution FS / N)
+RESYNC_INTERVAL = 65536  # Samples between exact recomputations of the tracked bins
+SUB_BLOCK = 4096  # Largest number of samples updated in one vectorized step
+BLOCK_ROWS = 100000  # Rows read from the input per block
+DRIFT_TOLERANCE = 1.0  # Alarm when the dominant frequency moves this far from the reference (Hz)
+MIN_MAGNITUDE = 0.0  # Ignore windows whose dominant magnitude is below this (no alarm)
+# ------------------
+
+
+class SlidingDFTTracker:
+    """Dominant frequency of the last window_len samples, updated sample by sample.
+
+    A sliding DFT keeps one complex accumulator per tracked bin and channel:
+        Y_k(n) = Y_k(n-1) + (x[n] - x[n-N]) * exp(-2j*pi*k*n/N)
+    which is the DFT of the current window up to a phase factor, so |Y_k(n)| is exactly
+    the magnitude compute_spectrum() would report for those N samples (no window, no
+    scaling). Each new sample costs O(bins). Rounding errors accumulate in the running
+    sums, so the bins are recomputed from the delay line every RESYNC_INTERVAL samples.
+    """
+
+    def __init__(self, fs=FS, window_len=WINDOW_LEN, bins=None, n_channels=len(CHANNELS),
+                 resync_interval=RESYNC_INTERVAL):
+        if window_len < 2:
+            raise ValueError("window_len must be at least 2.")
+        self.fs = fs
+        self.window_len = int(window_len)
+        # Default: the non-DC bins compute_spectrum() looks at (Nyquist excluded for even N)
+        self.bins = np.arange(1, (self.window_len + 1) // 2) if bins is None else np.asarray(bins, dtype=np.intp)
+        if len(self.bins) == 0 or np.any((self.bins < 0) | (self.bins > self.window_len // 2)):
+            raise ValueError(f"bins must be non-empty and within 0..{self.window_len // 2}.")
+        self.freqs = self.bins * fs / self.window_len
+        self.n_channels = n_channels
+        self.resync_interval = int(resync_interval)
+        # Twiddle table indexed by n mod N: (N, bins)
+        phase = np.outer(np.arange(self.window_len), self.bins) % self.window_len
+        self._twiddle = np.exp(-2j * np.pi * phase / self.window_len)
+        self._ring = np.zeros((self.window_len, n_channels))  # x[n - N] lives at n mod N
+        self._acc = np.zeros((len(self.bins), n_channels), dtype=np.complex128)
+        self.n_samples = 0
+        self._since_resync = 0
+
+    @classmethod
+    def for_frequencies(cls, frequencies_hz, fs=FS, window_len=WINDOW_LEN, **kwargs):
+        """Tracks only the bins nearest to the given frequencies (a Goertzel-style bank)."""
+        bins = np.unique(np.rint(np.asarray(frequencies_hz) * window_len / fs).astype(np.intp))
+        return cls(fs, window_len, bins=bins, **kwargs)
+
+    def reset(self):
+        self._ring[:] = 0.0
+        self._acc[:] = 0.0
+        self.n_samples = 0
+        self._since_resync = 0
+
+    @property
+    def ready(self):
+        """True once a full window has been seen."""
+        return self.n_samples >= self.window_len
+
+    @property
+    def magnitude(self):
+        """Current |DFT| of the tracked bins, (bins, n_channels)."""
+        return np.abs(self._acc)
+
+    def _resync(self):
+        """Recomputes the accumulators exactly from the samples in the window."""
+        # Ring slot r holds the sample with absolute index = r (mod N), matching the twiddles
+        self._acc = self._twiddle.T @ self._ring
+        self._since_resync = 0
+
+    def update(self, block):
+        """Feeds (n, n_channels) samples; returns (dominant_freq, dominant_mag), each (n, n_channels).
+
+        Both are NaN for samples before the first full window.
+        """
+        block = np.asarray(block, dtype=np.float64).reshape(-1, self.n_channels)
+        dominant_freq = np.full(block.shape, np.nan)
+        dominant_mag = np.full(block.shape, np.nan)
+        step = min(self.window_len, SUB_BLOCK)
+
+        for start in range(0, len(block), step):
+            piece = block[start : start + step]
+            n = len(piece)
+            slots = (self.n_samples + np.arange(n)) % self.window_len
+            # Samples leaving the window are still in the ring (n <= N), so read before writing
+            delta = piece - self._ring[slots]
+            self._ring[slots] = piece
+            # Running sum of every sample's contribution: (n, bins, n_channels)
+            sums = np.cumsum(delta[:, np.newaxis, :] * self._twiddle[slots][:, :, np.newaxis], axis=0)
+            sums += self._acc
+            self._acc = sums[-1].copy()
+
+            magnitude = np.abs(sums)
+            best = np.argmax(magnitude, axis=1)
+            filled = self.n_samples + np.arange(n) + 1 >= self.window_len
+            rows = slice(start, start + n)
+            dominant_freq[rows] = np.where(filled[:, np.newaxis], self.freqs[best], np.nan)
+            dominant_mag[rows] = np.where(filled[:, np.newaxis],
+                                          np.take_along_axis(magnitude, best[:, np.newaxis, :], axis=1)[:, 0], np.nan)
+
+            self.n_samples += n
+            self._since_resync += n
+            if self._since_resync >= self.resync_interval:
+                self._resync()
+        return dominant_freq, dominant_mag
+
+    def process_sample(self, sample):
+        """Feeds one sample (one value per channel); returns (dominant_freq, dominant_mag) per channel."""
+        sample = np.asarray(sample, dtype=np.float64).reshape(self.n_channels)
+        slot = self.n_samples % self.window_len
+        self._acc += (sample - self._ring[slot]) * self._twiddle[slot][:, np.newaxis]
+        self._ring[slot] = sample
+        self.n_samples += 1
+        self._since_resync += 1
+        if self._since_resync >= self.resync_interval:
+            self._resync()
+        if not self.ready:
+            return np.full(self.n_channels, np.nan), np.full(self.n_channels, np.nan)
+        magnitude = np.abs(self._acc)
+        best = np.argmax(magnitude, axis=0)
+        return self.freqs[best], magnitude[best, np.arange(self.n_channels)]
+
+
+class DriftAlarm:
+    """Flags when a channel's dominant frequency leaves reference +/- tolerance.
+
+    With reference=None each channel's reference is its first valid dominant frequency.
+    """
+
+    def __init__(self, tolerance=DRIFT_TOLERANCE, reference=None, min_magnitude=MIN_MAGNITUDE,
+                 n_channels=len(CHANNELS)):
+        self.tolerance = tolerance
+        self.reference = np.full(n_channels, np.nan) if reference is None else np.broadcast_to(
+            np.asarray(reference, dtype=np.float64), (n_channels,)).copy()
+        self.min_magnitude = min_magnitude
+        self.active = np.zeros(n_channels, dtype=bool)
+
+    def check(self, dominant_freq, dominant_mag):
+        """Returns (row, channel, drifting) for every alarm raised or cleared in this block."""
+        valid = ~np.isnan(dominant_freq) & (dominant_mag >= self.min_magnitude)
+        events = []
+        for j in range(dominant_freq.shape[1]):
+            rows = np.flatnonzero(valid[:, j])
+            if len(rows) == 0:
+                continue
+            if np.isnan(self.reference[j]):
+                self.reference[j] = dominant_freq[rows[0], j]
+            drifting = np.abs(dominant_freq[rows, j] - self.reference[j]) > self.tolerance
+            # Only the transitions matter: compare each state with the one before it
+            previous = np.concatenate(([self.active[j]], drifting[:-1]))
+            for i in np.flatnonzero(drifting != previous):
+                events.append((int(rows[i]), j, bool(drifting[i])))
+            self.active[j] = drifting[-1]
+        return sorted(events)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Track the dominant frequency sample by sample (sliding DFT).')
+    parser.add_argument('--input', default=INPUT_FILE, help=f'Resampled data, binary or text (default: {INPUT_FILE}).')
+    parser.add_argument('--output', default=OUTPUT_FILE, help=f'Per-sample track (default: {OUTPUT_FILE}).')
+    parser.add_argument('--window-len', type=int, default=WINDOW_LEN, help=f'Sliding window length (default: {WINDOW_LEN}).')
+    parser.add_argument('--freqs', type=float, nargs='+', default=None,
+                        help='Only track the bins nearest to these frequencies in Hz (default: all non-DC bins).')
+    parser.add_argument('--reference', type=float, default=None,
+                        help='Expected dominant frequency in Hz (default: the first full window of each channel).')
+    parser.add_argument('--tolerance', type=float, default=DRIFT_TOLERANCE,
+                        help=f'Allowed drift in Hz before an alarm (default: {DRIFT_TOLERANCE}).')
+    parser.add_argument('--min-magnitude', type=float, default=MIN_MAGNITUDE,
+                        help=f'Ignore windows with a weaker dominant component (default: {MIN_MAGNITUDE}).')
+    args = parser.parse_args()
+
+    try:
+        if args.freqs:
+            tracker = SlidingDFTTracker.for_frequencies(args.freqs, FS, args.window_len)
+        else:
+            tracker = SlidingDFTTracker(FS, args.window_len)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    alarm = DriftAlarm(args.tolerance, args.reference, args.min_magnitude)
+    print(f"Tracking {len(tracker.bins)} bin(s) over a {tracker.window_len}-sample window "
+          f"(resolution {FS / tracker.window_len:.3f} Hz).")
+
+    columns = ['time'] + [f'{channel}_{kind}' for channel in CHANNELS for kind in ('dominant_hz', 'dominant_mag')]
+    n_alarms = 0
+    try:
+        with TableWriter(args.output, columns) as writer:
+            for block in iter_table(args.input, columns=['time'] + CHANNELS, block_rows=BLOCK_ROWS):
+                dominant_freq, dominant_mag = tracker.update(np.column_stack([block[c] for c in CHANNELS]))
+                for row, j, drifting in alarm.check(dominant_freq, dominant_mag):
+                    t = block['time'][row]
+                    if drifting:
+                        n_alarms += 1
+                        print(f"ALARM t={t:.3f}s {CHANNELS[j]}: dominant {dominant_freq[row, j]:.2f} Hz, "
+                              f"reference {alarm.reference[j]:.2f} Hz")
+                    else:
+                        print(f"Cleared t={t:.3f}s {CHANNELS[j]}: back at {dominant_freq[row, j]:.2f} Hz")
+                table = {'time': block['time']}
+                for j, channel in enumerate(CHANNELS):
+                    table[f'{channel}_dominant_hz'] = dominant_freq[:, j]
+                    table[f'{channel}_dominant_mag'] = dominant_mag[:, j]
+                writer.write(table)
+    except FileNotFoundError:
+        print(f"Error: Input file '{args.input}' not found.")
+        sys.exit(1)
+
+    print(f"Processed {tracker.n_samples} samples, {n_alarms} drift alarm(s).")
+    if tracker.ready:
+        freq, mag = tracker.freqs[np.argmax(tracker.magnitude, axis=0)], tracker.magnitude.max(axis=0)
+        for channel, f, m in zip(CHANNELS, freq, mag):
+            print(f"{channel}: {f:.2f} Hz (Magnitude: {m:.2f}) over the last window")
+    else:
+        print(f"Warning: fewer than {tracker.window_len} samples; no full window was seen.")
+    print(f"Track saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+import numpy as np
+import argparse
+import asyncio
+import sys
+import time
+
+from ingest_server import HOST, PORT, TARGET_FS, WINDOW_LEN, CHANNELS
+
+# --- Parameters ---
+N_DEVICES = 4  # Simulated devices, each on its own connection
+DURATION_SEC = 60.0  # Signal length per device
+DEVICE_RATE = 43.0  # Mean device sampling rate (Hz); the spacing is jittered like the real logs
+JITTER = 0.2  # Relative spread of the sample spacing
+BASE_FREQ = 2.0  # Device i vibrates at BASE_FREQ + i * FREQ_STEP Hz (x) and 1.5x that (y)
+FREQ_STEP = 1.5
+LINES_PER_WRITE = 200  # Rows per socket write
+SEED = 0
+# ------------------
+
+
+def simulated_log(device_index, duration_sec=DURATION_SEC, rate=DEVICE_RATE, seed=SEED):
+    """(time deltas, (n, 2) values, x frequency, y frequency) of one simulated device."""
+    rng = np.random.default_rng(seed + device_index)
+    n = int(duration_sec * rate)
+    time_delta = rng.uniform(1 - JITTER, 1 + JITTER, n) / rate
+    t = np.cumsum(time_delta)
+    freq_x = BASE_FREQ + device_index * FREQ_STEP
+    freq_y = 1.5 * freq_x
+    values = np.column_stack((2.0 * np.sin(2 * np.pi * freq_x * t), 1.5 * np.cos(2 * np.pi * freq_y * t)))
+    values += rng.normal(scale=0.3, size=values.shape)
+    return time_delta, np.round(values, 2), freq_x, freq_y
+
+
+def log_lines(path):
+    """(header line, data lines) of a raw log file to replay."""
+    with open(path) as f:
+        header = f.readline()
+        return header, f.readlines()
+
+
+async def run_device(device_id, header, lines, host=HOST, port=PORT, unix_path=None, realtime_rate=None):
+    """Streams the lines as one device and returns the server's reply line."""
+    if unix_path is not None:
+        reader, writer = await asyncio.open_unix_connection(unix_path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f'DEVICE {device_id}\n{header.rstrip()}\n'.encode('utf-8'))
+    for start in range(0, len(lines), LINES_PER_WRITE):
+        writer.write(''.join(lines[start : start + LINES_PER_WRITE]).encode('utf-8'))
+        await writer.drain()  # Blocks while the server applies backpressure
+        if realtime_rate:
+            await asyncio.sleep(LINES_PER_WRITE / realtime_rate)
+    writer.write_eof()
+    reply = (await reader.readline()).decode('utf-8').strip()
+    writer.close()
+    await writer.wait_closed()
+    return reply
+
+
+def parse_reply(reply):
+    """Fields of a 'DONE key=value ...' reply as a dict (empty for ERROR replies)."""
+    if not reply.startswith('DONE'):
+        return {}
+    return dict(field.split('=', 1) for field in reply.split()[1:])
+
+
+async def simulate(args):
+    jobs = []
+    if args.replay:
+        header, lines = log_lines(args.replay)
+        for i in range(args.devices):
+            jobs.append((f'replay-{i:03d}', header, lines, None))
+    else:
+        header = '\t'.join(['time'] + CHANNELS)
+        for i in range(args.devices):
+            time_delta, values, freq_x, freq_y = simulated_log(i, args.duration, args.rate)
+            lines = [f'{dt:.6f}\t{x:.2f}\t{y:.2f}\n' for dt, (x, y) in zip(time_delta, values)]
+            jobs.append((f'sim-{i:03d}', header, lines, (freq_x, freq_y)))
+
+    started = time.perf_counter()
+    replies = await asyncio.gather(*(run_device(device_id, header, lines, args.host, args.port, args.unix,
+                                                args.rate if args.realtime else None)
+                                     for device_id, header, lines, _ in jobs), return_exceptions=True)
+    elapsed = time.perf_counter() - started
+
+    n_lines = sum(len(lines) for _, _, lines, _ in jobs)
+    print(f"Sent {n_lines} samples from {len(jobs)} device(s) in {elapsed:.2f}s ({n_lines / elapsed:.0f} samples/s).")
+    resolution = TARGET_FS / WINDOW_LEN
+    failed = 0
+    for (device_id, _, _, expected), reply in zip(jobs, replies):
+        if isinstance(reply, Exception):
+            print(f"{device_id}: connection failed: {reply}")
+            failed += 1
+            continue
+        print(reply)
+        fields = parse_reply(reply)
+        if not fields:
+            failed += 1
+        elif expected is not None:
+            measured = [float(fields[f'{channel}_hz']) for channel in CHANNELS]
+            # The sliding DFT reports bin centres, so allow one bin of error
+            if any(abs(m - e) > resolution for m, e in zip(measured, expected)):
+                print(f"  MISMATCH: expected {expected[0]:.2f} / {expected[1]:.2f} Hz")
+                failed += 1
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulated devices for testing ingest_server.py locally.')
+    parser.add_argument('--host', default=HOST, help=f'Server address (default: {HOST}).')
+    parser.add_argument('--port', type=int, default=PORT, help=f'Server port (default: {PORT}).')
+    parser.add_argument('--unix', default=None, help='Connect to this Unix socket instead of TCP.')
+    parser.add_argument('--devices', type=int, default=N_DEVICES, help=f'Concurrent devices (default: {N_DEVICES}).')
+    parser.add_argument('--duration', type=float, default=DURATION_SEC,
+                        help=f'Seconds of signal per device (default: {DURATION_SEC}).')
+    parser.add_argument('--rate', type=float, default=DEVICE_RATE, help=f'Device sampling rate in Hz (default: {DEVICE_RATE}).')
+    parser.add_argument('--realtime', action='store_true', help='Pace the samples at the device rate instead of sending at full speed.')
+    parser.add_argument('--replay', default=None, help='Send this raw log (e.g. datates.txt) from every device instead.')
+    args = parser.parse_args()
+
+    try:
+        failed = asyncio.run(simulate(args))
+    except OSError as e:
+        print(f"Error: could not reach the server: {e}")
+        sys.exit(1)
+    if failed:
+        print(f"{failed} device(s) failed.")
+        sys.exit(1)
+    print("All devices OK.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,336 @@
+import numpy as np
+import argparse
+import asyncio
+import os
+import re
+import signal
+import sys
+import time
+
+from data_io import TableWriter, parse_log_block
+from filter_design import design_lowpass
+from frequency_tracker import SlidingDFTTracker
+from resample_data import StreamingResampler
+from streaming_filter import StreamingFIRFilter
+from verbosity import info, set_quiet
+
+# --- Parameters ---
+HOST = '127.0.0.1'  # Local TCP only by default
+PORT = 8765
+OUTPUT_DIR = 'ingest_output'  # One <device>.f64 results table per device, continued across runs
+TARGET_FS = 50.0  # Resampling rate (Hz)
+CUTOFF_FREQ = 10.0  # Low-pass cutoff (Hz)
+FILTER_ORDER = 40  # Filter order (Numtaps = Order + 1)
+WINDOW_LEN = 64  # Sliding-DFT window for the dominant frequency (resolution TARGET_FS / WINDOW_LEN)
+CHANNELS = ['xaccel', 'yaccel']
+READ_CHUNK_BYTES = 64 * 1024  # Most bytes read from a connection before processing them
+MAX_LINE_BYTES = 64 * 1024  # Longer lines end the connection (bounds the partial-line buffer)
+QUEUE_BATCHES = 64  # Result batches waiting for the writer before connections stop being read
+WRITE_BATCH_ROWS = 5000  # Rows buffered per device before they are written...
+FLUSH_INTERVAL_SEC = 1.0  # ...or after this long, whichever comes first
+HANDSHAKE_TIMEOUT_SEC = 10.0  # Time a new connection has to send its DEVICE and header lines
+# ------------------
+#
+# Protocol (one connection per device, UTF-8 text, '\n' line ends):
+#   DEVICE <id>                     id: letters, digits, '.', '_' or '-'
+#   <header>                        tab-separated column names including time, xaccel, yaccel
+#   <values>...                     tab-separated rows like the raw logs; time holds the
+#                                   delta to the previous sample in seconds
+# When the device closes its side (EOF), the server answers with one line
+#   DONE device=<id> samples=<in> rows=<out> xaccel_hz=<f> yaccel_hz=<f>
+# (or ERROR <reason>) and closes the connection. A device that reconnects with the same
+# id continues its stream: resampler, filter and tracker state are kept per device.
+#
+# Backpressure: each connection processes what it has read before reading more, and
+# hands its results to the writer through a bounded queue. When the disk falls behind,
+# the queue fills, connections stop reading, and TCP flow control slows the devices.
+
+RESULT_COLUMNS = (['time'] + CHANNELS + [f'{channel}_filtered' for channel in CHANNELS]
+                  + [f'{channel}_dominant_hz' for channel in CHANNELS])
+DEVICE_ID_PATTERN = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+_STOP = object()  # Tells the writer task to flush everything and finish
+
+
+class DeviceProcessor:
+    """Per-device chain: resampling to fs, causal FIR low-pass and sliding-DFT dominant frequency."""
+
+    def __init__(self, device_id, fs=TARGET_FS, coeffs=None, window_len=WINDOW_LEN):
+        self.device_id = device_id
+        if coeffs is None:
+            coeffs = design_lowpass(fs, CUTOFF_FREQ, FILTER_ORDER + 1)
+        self.resampler = StreamingResampler(fs, n_channels=len(CHANNELS))
+        self.fir = StreamingFIRFilter(coeffs, n_channels=len(CHANNELS))
+        self.tracker = SlidingDFTTracker(fs, window_len, n_channels=len(CHANNELS))
+        self.n_input = 0
+        self.n_output = 0
+        self.dominant_hz = np.full(len(CHANNELS), np.nan)
+
+    def _results(self, target_time_sec, resampled):
+        if len(target_time_sec) == 0:
+            return None
+        filtered = self.fir.process(resampled)
+        dominant_freq, _ = self.tracker.update(resampled)
+        self.n_output += len(target_time_sec)
+        if self.tracker.ready:
+            self.dominant_hz = dominant_freq[-1]
+        table = {'time': target_time_sec}
+        for j, channel in enumerate(CHANNELS):
+            table[channel] = resampled[:, j]
+            table[f'{channel}_filtered'] = filtered[:, j]
+            table[f'{channel}_dominant_hz'] = dominant_freq[:, j]
+        return table
+
+    def process(self, time_delta, values):
+        """Feeds raw samples (time deltas, (n, channels) values); returns the new result rows or None."""
+        self.n_input += len(time_delta)
+        return self._results(*self.resampler.update(time_delta, values))
+
+    def flush(self):
+        """Results for the samples held back until a later sample arrives (end of a connection)."""
+        return self._results(*self.resampler.flush())
+
+
+class IngestServer:
+    """asyncio server that runs every connected device through its DeviceProcessor.
+
+    Results are appended to one binary table per device by a single writer task, in
+    batches of up to WRITE_BATCH_ROWS rows or every FLUSH_INTERVAL_SEC.
+    """
+
+    def __init__(self, output_dir=OUTPUT_DIR, fs=TARGET_FS, cutoff=CUTOFF_FREQ, filter_order=FILTER_ORDER,
+                 window_len=WINDOW_LEN, queue_batches=QUEUE_BATCHES, write_batch_rows=WRITE_BATCH_ROWS,
+                 flush_interval=FLUSH_INTERVAL_SEC):
+        self.output_dir = output_dir
+        self.fs = fs
+        self.window_len = window_len
+        self.coeffs = design_lowpass(fs, cutoff, filter_order + 1)
+        self.write_batch_rows = write_batch_rows
+        self.flush_interval = flush_interval
+        self.devices = {}  # device id -> DeviceProcessor, kept across reconnects
+        self._connected = set()  # Device ids with an open connection
+        self._connections = {}  # Connection handler task -> its (reader, writer)
+        self._stopping = False
+        self._queue = asyncio.Queue(maxsize=queue_batches)
+        self._writers = {}  # device id -> TableWriter
+        self._server = None
+        self._writer_task = None
+        self.n_rows_written = 0
+
+    async def start(self, host=HOST, port=PORT, unix_path=None):
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._writer_task = asyncio.create_task(self._write_results())
+        if unix_path is not None:
+            self._server = await asyncio.start_unix_server(self._handle_connection, path=unix_path)
+        else:
+            self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server
+
+    @property
+    def addresses(self):
+        return [sock.getsockname() for sock in self._server.sockets] if self._server else []
+
+    async def stop(self):
+        """Clean shutdown: no new connections, open ones are flushed and closed, all results written.
+
+        Open connections are not cancelled: they stop reading and finish as if their device
+        had closed its side, so every row they processed still reaches the writer.
+        """
+        self._stopping = True
+        if self._server is not None:
+            self._server.close()
+        for reader, writer in list(self._connections.values()):
+            writer.transport.pause_reading()  # No data may arrive after the EOF below
+            reader.feed_eof()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+        if self._writer_task is not None:
+            await self._queue.put(_STOP)
+            await self._writer_task
+        for writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+
+    # --- Connections ---
+    async def _handshake(self, reader):
+        """Reads the DEVICE and header lines; returns (device id, header fields)."""
+        hello = (await asyncio.wait_for(reader.readline(), HANDSHAKE_TIMEOUT_SEC)).decode('utf-8', 'replace').split()
+        if len(hello) != 2 or hello[0] != 'DEVICE' or not DEVICE_ID_PATTERN.match(hello[1]):
+            raise ValueError("expected 'DEVICE <id>' as the first line")
+        header = (await asyncio.wait_for(reader.readline(), HANDSHAKE_TIMEOUT_SEC)).decode('utf-8', 'replace')
+        header = header.rstrip('\r\n').split('\t')
+        missing = [name for name in ['time'] + CHANNELS if name not in header]
+        if missing:
+            raise ValueError(f"header is missing column(s) {missing}")
+        return hello[1], header
+
+    async def _handle_connection(self, reader, writer):
+        self._connections[asyncio.current_task()] = (reader, writer)
+        device_id = None
+        reply = None
+        try:
+            if self._stopping:
+                reply = "ERROR server shutting down"
+                return
+            try:
+                device_id, header = await self._handshake(reader)
+            except (ValueError, asyncio.TimeoutError) as e:
+                if self._stopping:
+                    reply = "ERROR server shutting down"
+                else:
+                    reply = f"ERROR {e if str(e) else 'handshake timed out'}"
+                return
+            if device_id in self._connected:
+                reply = f"ERROR device {device_id} is already connected"
+                device_id = None
+                return
+            self._connected.add(device_id)
+            if device_id not in self.devices:
+                self.devices[device_id] = DeviceProcessor(device_id, self.fs, self.coeffs, self.window_len)
+            processor = self.devices[device_id]
+            info(f"Device {device_id} connected.")
+
+            usecols = [header.index(name) for name in ['time'] + CHANNELS]
+            line_number = 3  # First data line (after DEVICE and the header)
+            pending = b''  # Start of a line whose end has not arrived yet
+            while True:
+                chunk = await reader.read(READ_CHUNK_BYTES)
+                if not chunk:
+                    break
+                pending += chunk
+                end = pending.rfind(b'\n') + 1
+                if end > 0:
+                    block, pending = pending[:end], pending[end:]
+                    await self._process_block(processor, block, line_number, len(header), usecols)
+                    line_number += block.count(b'\n')
+                if len(pending) > MAX_LINE_BYTES:
+                    reply = f"ERROR line {line_number} is longer than {MAX_LINE_BYTES} bytes"
+                    return
+            if pending.strip() and not self._stopping:  # At shutdown the last line may be cut short
+                await self._process_block(processor, pending, line_number, len(header), usecols)
+            reply = (f"DONE device={device_id} samples={processor.n_input} rows={processor.n_output} "
+                     + ' '.join(f'{channel}_hz={hz:.4f}' for channel, hz in zip(CHANNELS, processor.dominant_hz)))
+        except asyncio.CancelledError:
+            reply = "ERROR server shutting down"
+        except ConnectionError:
+            pass  # Device went away; what it sent so far is kept
+        finally:
+            if device_id is not None:
+                # Runs on EOF, errors and shutdown alike, so no bracketed sample is lost
+                table = self.devices[device_id].flush()
+                if table is not None:
+                    await self._queue.put((device_id, table))
+                self._connected.discard(device_id)
+                info(f"Device {device_id} disconnected.")
+            if reply is not None:
+                try:
+                    writer.write((reply + '\n').encode('utf-8'))
+                    await writer.drain()
+                except ConnectionError:
+                    pass
+            writer.close()
+            self._connections.pop(asyncio.current_task(), None)
+
+    async def _process_block(self, processor, block, first_line, n_fields, usecols):
+        values, bad_lines = parse_log_block(block, first_line, n_fields, usecols)
+        if bad_lines:
+            print(f"Warning: device {processor.device_id}: skipped {len(bad_lines)} malformed line(s), "
+                  f"first at line {bad_lines[0][0]}: {bad_lines[0][2][:80]!r}")
+        if len(values) == 0:
+            return
+        table = processor.process(values[:, 0], values[:, 1:])
+        if table is not None:
+            await self._queue.put((processor.device_id, table))  # Waits while the writer is behind
+        await asyncio.sleep(0)  # Let the other connections in between blocks
+
+    # --- Writer ---
+    def _write(self, device_id, tables):
+        """Appends the buffered result blocks of one device to its table (runs in a worker thread)."""
+        if device_id not in self._writers:
+            # Continue the device's table across server restarts and reconnects
+            self._writers[device_id] = TableWriter(os.path.join(self.output_dir, f'{device_id}.f64'), RESULT_COLUMNS,
+                                                   append=True)
+        table = {name: np.concatenate([t[name] for t in tables]) for name in RESULT_COLUMNS}
+        self._writers[device_id].write(table)
+        return len(table['time'])
+
+    async def _write_results(self):
+        buffers = {}  # device id -> list of result tables
+        buffered_rows = {}
+        last_flush = time.monotonic()
+
+        async def flush(device_ids):
+            for device_id in device_ids:
+                if buffers.get(device_id):
+                    self.n_rows_written += await asyncio.to_thread(self._write, device_id, buffers.pop(device_id))
+                    buffered_rows[device_id] = 0
+
+        while True:
+            timeout = max(0.0, self.flush_interval - (time.monotonic() - last_flush))
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                item = None
+            if item is _STOP:
+                await flush(list(buffers))
+                return
+            if item is not None:
+                device_id, table = item
+                buffers.setdefault(device_id, []).append(table)
+                buffered_rows[device_id] = buffered_rows.get(device_id, 0) + len(table['time'])
+                if buffered_rows[device_id] >= self.write_batch_rows:
+                    await flush([device_id])
+            if time.monotonic() - last_flush >= self.flush_interval:
+                await flush(list(buffers))
+                last_flush = time.monotonic()
+
+
+async def serve(args):
+    server = IngestServer(args.output_dir, args.fs, flush_interval=args.flush_interval)
+    await server.start(args.host, args.port, args.unix)
+    print(f"Listening on {args.unix or ', '.join(f'{a[0]}:{a[1]}' for a in server.addresses)}; "
+          f"results go to {args.output_dir}/<device>.f64. Press Ctrl+C to stop.")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            signal.signal(sig, lambda *_: loop.call_soon_threadsafe(stop.set))  # e.g. Windows
+    await stop.wait()
+
+    print("\nShutting down...")
+    await server.stop()
+    if args.unix and os.path.exists(args.unix):
+        os.remove(args.unix)
+    for device_id, processor in sorted(server.devices.items()):
+        print(f"{device_id}: {processor.n_input} samples in, {processor.n_output} rows out, dominant "
+              + ', '.join(f'{channel} {hz:.2f} Hz' for channel, hz in zip(CHANNELS, processor.dominant_hz)))
+    print(f"Wrote {server.n_rows_written} rows for {len(server.devices)} device(s) to {args.output_dir}.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ingest live accelerometer feeds: resample, filter and track '
+                                                 'the dominant frequency of every connected device.')
+    parser.add_argument('--host', default=HOST, help=f'TCP address to listen on (default: {HOST}).')
+    parser.add_argument('--port', type=int, default=PORT, help=f'TCP port (default: {PORT}).')
+    parser.add_argument('--unix', default=None, help='Listen on this Unix socket path instead of TCP.')
+    parser.add_argument('--output-dir', default=OUTPUT_DIR, help=f'Directory for the results (default: {OUTPUT_DIR}).')
+    parser.add_argument('--fs', type=float, default=TARGET_FS, help=f'Resampling rate in Hz (default: {TARGET_FS}).')
+    parser.add_argument('--flush-interval', type=float, default=FLUSH_INTERVAL_SEC,
+                        help=f'Longest time results wait before being written, in seconds (default: {FLUSH_INTERVAL_SEC}).')
+    parser.add_argument('--quiet', action='store_true', help='Do not log connects and disconnects.')
+    args = parser.parse_args()
+    if args.quiet:
+        set_quiet()
+
+    try:
+        asyncio.run(serve(args))
+    except OSError as e:
+        print(f"Error: could not start the server: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+import contextlib
+import json
+import os
+import sys
+import time
+
+# --- Parameters ---
+METRICS_ENV = 'PIPELINE_METRICS'  # File to append JSON lines to ('-' for stderr); unset = off
+PROFILE_ENV = 'PIPELINE_PROFILE'  # Stage name to run under cProfile
+PROFILE_TOP = 20  # Functions listed in the cProfile summary
+# ------------------
+#
+# Every stage record is one JSON object per line, e.g.
+# {"script": "apply_filter", "stage": "filter", "wall_s": 0.012, "cpu_s": 0.011,
+#  "peak_rss_mb": 84.2, "n_samples": 100000, "samples_per_s": 8.3e6, ...}
+# With metrics off, stage() only builds one dict, so it can stay in production code.
+
+_metrics_path = os.environ.get(METRICS_ENV) or None
+_profile_stage = os.environ.get(PROFILE_ENV) or None
+
+
+def set_metrics_file(path):
+    """Appends stage records to path ('-' = stderr, None = off)."""
+    global _metrics_path
+    _metrics_path = path
+
+
+def set_profile_stage(name):
+    """Runs the stage called name under cProfile (None = off)."""
+    global _profile_stage
+    _profile_stage = name
+
+
+def _script_name():
+    return os.path.splitext(os.path.basename(sys.argv[0] or 'python'))[0]
+
+
+def _reset_peak_rss():
+    """Resets the kernel's RSS high-water mark (Linux); False where that is not possible."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb():
+    """Peak resident set size in MB: VmHWM on Linux, otherwise getrusage's process maximum."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 1024.0  # bytes on macOS, KiB elsewhere
+
+
+def _emit(record):
+    line = json.dumps(record, default=float)
+    if _metrics_path == '-':
+        print(line, file=sys.stderr, flush=True)
+        return
+    try:
+        # One short append per record, so several processes can share the file
+        with open(_metrics_path, 'a') as f:
+            f.write(line + '\n')
+    except OSError as e:
+        print(f"Warning: could not write metrics to {_metrics_path}: {e}", file=sys.stderr)
+
+
+@contextlib.contextmanager
+def stage(name, n_samples=None, **fields):
+    """Measures one pipeline stage: wall time, CPU time, peak RSS and throughput.
+
+    Yields the record dict, so n_samples (or any extra field) can be filled in once it
+    is known. peak_rss_mb covers just this stage where the kernel lets the high-water
+    mark be reset (Linux); elsewhere it is the process peak so far ('peak_rss_scope').
+    """
+    record = {'script': _script_name(), 'stage': name, 'n_samples': n_samples}
+    record.update(fields)
+    profiling = _profile_stage == name
+    if _metrics_path is None and not profiling:
+        yield record
+        return
+
+    profiler = None
+    if profiling:
+        import cProfile
+        profiler = cProfile.Profile()
+    scope = 'stage' if _reset_peak_rss() else 'process'
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    status = 'ok'
+    try:
+        if profiler is not None:
+            profiler.enable()
+        yield record
+    except BaseException:
+        status = 'error'
+        raise
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        wall_s = time.perf_counter() - wall_start
+        record.update({
+            'status': status,
+            'wall_s': wall_s,
+            'cpu_s': time.process_time() - cpu_start,
+            'peak_rss_mb': _peak_rss_mb(),
+            'peak_rss_scope': scope,
+            'pid': os.getpid(),
+            'timestamp': time.time(),
+        })
+        if record['n_samples'] is not None and wall_s > 0:
+            record['samples_per_s'] = record['n_samples'] / wall_s
+        if profiler is not None:
+            _report_profile(profiler, name)
+        if _metrics_path is not None:
+            _emit(record)
+
+
+def _report_profile(profiler, name):
+    """Saves the profile next to the outputs and prints the top functions to stderr."""
+    import pstats
+    path = f'profile_{_script_name()}_{name}.prof'
+    profiler.dump_stats(path)
+    print(f"\n--- cProfile: stage '{name}' (saved to {path}) ---", file=sys.stderr)
+    pstats.Stats(profiler, stream=sys.stderr).sort_stats('cumulative').print_stats(PROFILE_TOP)
@@ -0,0 +1,348 @@
+import numpy as np
+import argparse
+import os
+import sys
+
+from data_io import (load_table, save_table, text_export_path, is_binary, load_log, report_bad_lines,
+                     load_segments, segments_path, as_float_array)
+from resample_data import resample_interp, resample_polyphase, resample_segments, decimate_multistage
+from apply_filter import filter_channels, filter_channels_tail, filter_segments, plot_comparison, FILTER_METHODS
+from filter_design import design_lowpass, set_disk_cache_dir
+from analyze_frequency import compute_spectrum, spectrum_peaks, plot_spectrum
+from visualize_resampled import plot_resampled
+from instrumentation import stage, set_metrics_file, set_profile_stage
+from verbosity import info, set_quiet
+import result_cache
+
+# --- Parameters ---
+INPUT_FILE = 'datates.txt'  # Raw log (time deltas), or resampled data when 'resample' is skipped
+OUTPUT_DIR = '.'  # Where plots and (optional) intermediate files go
+TARGET_FS = 50.0  # Target sampling frequency (Hz)
+CUTOFF_FREQ = 10.0  # Low-pass cutoff frequency (Hz)
+FILTER_ORDER = 40  # Filter order (Numtaps = Order + 1)
+WINDOW_TYPE = 'hamming'
+CHANNELS = ['xaccel', 'yaccel']
+STAGES = ('resample', 'filter', 'analyze', 'visualize')
+RESAMPLE_METHODS = ('interp', 'polyphase', 'multistage')
+# ------------------
+#
+# Compact mode (--float32): the channels are loaded, resampled, filtered and transformed
+# as float32, which halves their share of memory and bandwidth; time stays float64 (a
+# float32 clock would lose milliseconds after a few hours) and saved tables keep the
+# float64 format. The raw logs carry 2 decimal digits, far below float32's ~7.
+# Error against the float64 run, as max |error| / max |signal|, worst case over
+# datates.txt and a 10^6-sample synthetic recording, every filter method, 41 taps:
+#   load (float32 rounding of the values)  <= 6e-8
+#   resample (interp)                      <= 1e-7
+#   filter                                 <= 3e-7  (grows slowly with the tap count)
+#   FFT magnitudes, relative to the peak   <= 1e-7; dominant frequencies identical
+
+
+def run_pipeline(time_sec, data, stages=STAGES, fs=TARGET_FS, cutoff=CUTOFF_FREQ,
+                 filter_order=FILTER_ORDER, window=WINDOW_TYPE, resample_method='interp',
+                 filter_method='filtfilt', output_dir=OUTPUT_DIR, save_intermediates=False,
+                 text=False, coeffs=None, max_gap=None, segments=None, source=None):
+    """Runs the selected stages in memory and returns their results as a dict.
+
+    time_sec holds absolute sample times and data is (n_samples, n_channels) with the
+    columns of CHANNELS. Without the 'resample' stage they are used as already resampled.
+    Files are only written for 'visualize' (plots) and when save_intermediates is set.
+    coeffs skips the filter design and uses the given FIR coefficients instead.
+    max_gap (seconds) resamples each stretch between longer gaps separately (interp only);
+    segments is the segment table of input that was already resampled that way. Either
+    way the filter then runs per segment and results['segments'] holds the table.
+
+    With the result cache on (result_cache.set_cache_dir), a stage whose input and
+    parameters match a stored result reuses it, and saved files and plots that already
+    hold a result are not rewritten. source names the recording (e.g. its path): when
+    its previous run saw a prefix of this input, interp resampling (without max_gap) and
+    the filter only compute the appended rows plus the filter's warm-up span.
+    """
+    results = {'time': np.asarray(time_sec, dtype=np.float64),
+               'resampled': as_float_array(data)}
+    if segments is not None:
+        results['segments'] = segments
+    if max_gap is not None and resample_method != 'interp' and 'resample' in stages:
+        raise ValueError("max_gap is only supported with the interp resampling method.")
+    os.makedirs(output_dir, exist_ok=True)
+
+    def save(name, table, key):
+        path = os.path.join(output_dir, name)
+        paths = [path] + ([text_export_path(path)] if text else [])
+        if key is not None and all(result_cache.is_current(p, key) for p in paths):
+            info(f"{path} is up to date.")
+            return
+        save_table(path, table)
+        if text:
+            save_table(text_export_path(path), table)
+        for p in paths:
+            result_cache.mark_written(p, key)
+        info(f"Saved {path}{' (+ text export)' if text else ''}.")
+
+    def plot(name, key, draw):
+        path = os.path.join(output_dir, name)
+        if key is not None and result_cache.is_current(path, key):
+            info(f"{path} is up to date.")
+            return
+        draw(path)
+        if key is not None and os.path.exists(path):
+            result_cache.mark_written(path, key)
+
+    # Cache key of each stage's result (None with the cache off)
+    keys = {}
+
+    # --- 1. Resample ---
+    if 'resample' in stages:
+        with stage('resample', len(results['time']), method=resample_method) as record:
+            n_input = len(results['time'])
+            entry, cached, n_done = result_cache.lookup(
+                'resample', _resample_params(resample_method, fs, cutoff, filter_order, window, max_gap),
+                (results['time'], results['resampled']), source=source,
+                extendable=resample_method == 'interp' and max_gap is None)
+            keys['resample'] = entry and entry['key']
+            _record_cache(record, entry, cached, n_done, n_input)
+            if cached is not None and n_done == n_input:
+                info("Resampling input unchanged; reusing the cached result.")
+                results['time'], results['resampled'] = cached['time'], cached['resampled']
+                if 'segment_n_rows' in cached:
+                    results['segments'] = {name[len('segment_'):]: values for name, values in cached.items()
+                                           if name.startswith('segment_')}
+            elif cached is not None:
+                info(f"{n_input - n_done} rows appended; resampling only the new tail to {fs} Hz...")
+                tail_time, tail = resample_interp(results['time'], results['resampled'], fs,
+                                                  start_row=len(cached['time']))
+                results['time'] = np.concatenate((cached['time'], tail_time))
+                results['resampled'] = np.concatenate((cached['resampled'], tail))
+            else:
+                info(f"Resampling to {fs} Hz ({resample_method})...")
+                if resample_method == 'polyphase':
+                    results['time'], results['resampled'] = resample_polyphase(
+                        results['time'], results['resampled'], fs, cutoff, filter_order, window)
+                elif resample_method == 'multistage':
+                    results['time'], results['resampled'] = decimate_multistage(
+                        results['time'], results['resampled'], fs, cutoff, window)
+                elif max_gap is not None:
+                    results['time'], results['resampled'], results['segments'] = resample_segments(
+                        results['time'], results['resampled'], fs, max_gap)
+                    info(f"Found {len(results['segments']['n_rows'])} segment(s) separated by gaps over {max_gap} s.")
+                else:
+                    results['time'], results['resampled'] = resample_interp(results['time'], results['resampled'], fs)
+            if cached is None or n_done < n_input:
+                arrays = {'time': results['time'], 'resampled': results['resampled']}
+                if max_gap is not None:
+                    arrays.update({f'segment_{name}': values for name, values in results['segments'].items()})
+                result_cache.store(entry, **arrays)
+            info(f"Resampled data has {len(results['time'])} points.")
+            if save_intermediates:
+                table = {'time': results['time']}
+                table.update({name: results['resampled'][:, i] for i, name in enumerate(CHANNELS)})
+                save('resampled_data.f64', table, keys['resample'])
+                if 'segments' in results:
+                    save(segments_path('resampled_data.f64'), results['segments'], keys['resample'])
+
+    # Every later stage reads the resampled data: hash it once for their cache keys
+    resampled_digest = None
+    if result_cache.is_enabled() and source is not None:
+        resampled_digest = result_cache.array_digest(results['time'], results['resampled'])
+
+    # --- 2. Filter ---
+    if 'filter' in stages:
+        with stage('filter', len(results['time']), method=filter_method, numtaps=filter_order + 1) as record:
+            if coeffs is None:
+                numtaps = filter_order + 1
+                info(f"Designing FIR Low-pass filter: fs={fs}Hz, cutoff={cutoff}Hz, numtaps={numtaps}, window={window}")
+                coeffs = design_lowpass(fs, cutoff, numtaps, window=window)
+            results['coeffs'] = coeffs
+            n_input = len(results['time'])
+            entry, cached, n_done = result_cache.lookup(
+                'filter', {'method': filter_method, 'coeffs': coeffs, 'segments': results.get('segments')},
+                (results['time'], results['resampled']), source=source,
+                extendable='segments' not in results, digest=resampled_digest)
+            keys['filter'] = entry and entry['key']
+            _record_cache(record, entry, cached, n_done, n_input)
+            if cached is not None and n_done == n_input:
+                info("Filter input unchanged; reusing the cached result.")
+                results['filtered'] = cached['filtered']
+            elif cached is not None:
+                info(f"{n_input - n_done} rows appended; filtering only the new tail plus the filter warm-up ({filter_method})...")
+                results['filtered'] = filter_channels_tail(results['resampled'], coeffs, cached['filtered'],
+                                                           method=filter_method)
+            else:
+                info(f"Applying filter ({filter_method}) to {', '.join(CHANNELS)}...")
+                if 'segments' in results:
+                    results['filtered'] = filter_segments(results['resampled'], results['coeffs'],
+                                                          results['segments'], method=filter_method)
+                else:
+                    results['filtered'] = filter_channels(results['resampled'], results['coeffs'], method=filter_method)
+            if cached is None or n_done < n_input:
+                result_cache.store(entry, filtered=results['filtered'])
+            if save_intermediates:
+                table = {'time': results['time']}
+                table.update({name: results['resampled'][:, i] for i, name in enumerate(CHANNELS)})
+                table.update({f'{name}_filtered': results['filtered'][:, i] for i, name in enumerate(CHANNELS)})
+                save('filtered_data.f64', table, keys['filter'])
+
+    # --- 3. Analyze ---
+    if 'analyze' in stages:
+        with stage('analyze', len(results['time'])) as record:
+            n_input = len(results['time'])
+            entry, cached, n_done = result_cache.lookup('analyze', {'fs': fs}, (results['time'], results['resampled']),
+                                                        source=source, digest=resampled_digest)
+            keys['analyze'] = entry and entry['key']
+            _record_cache(record, entry, cached, n_done, n_input)
+            if cached is not None:
+                info("Spectrum input unchanged; reusing the cached result.")
+                results['spectrum'] = spectrum_peaks(cached['freqs'], cached['magnitude'])
+            else:
+                info("Performing FFT...")
+                results['spectrum'] = compute_spectrum(results['resampled'], fs)
+                result_cache.store(entry, freqs=results['spectrum']['freqs'],
+                                   magnitude=results['spectrum']['magnitude'])
+            info("\n--- Dominant Frequencies (excluding DC) ---")
+            for name, freq, mag in zip(CHANNELS, results['spectrum']['dominant_freq'],
+                                       results['spectrum']['dominant_mag']):
+                info(f"{name}: {freq:.2f} Hz (Magnitude: {mag:.2f})")
+
+    # --- 4. Visualize ---
+    if 'visualize' in stages:
+        with stage('visualize', len(results['time'])):
+            info("Generating plots...")
+            # A plot is redrawn only when the result it shows (or fs) changed since it was drawn
+            plot_key = lambda key: key and result_cache.stage_key('visualize', {'fs': fs}, key)
+            plot('resampled_visualization.png', plot_key(resampled_digest),
+                 lambda path: plot_resampled(results['time'], results['resampled'][:, 0],
+                                             results['resampled'][:, 1], path, fs))
+            if 'filtered' in results:
+                plot('filtered_comparison.png', plot_key(keys['filter']),
+                     lambda path: plot_comparison(results['time'], results['resampled'], results['filtered'], path))
+            if 'spectrum' in results:
+                plot('frequency_spectrum.png', plot_key(keys['analyze']),
+                     lambda path: plot_spectrum(results['spectrum'], path, fs))
+
+    return results
+
+
+def _resample_params(method, fs, cutoff, filter_order, window, max_gap):
+    """The settings that change the resample stage's result (its cache key)."""
+    if method == 'polyphase':
+        return {'method': method, 'fs': fs, 'cutoff': cutoff, 'order': filter_order, 'window': window}
+    if method == 'multistage':
+        return {'method': method, 'fs': fs, 'cutoff': cutoff, 'window': window}
+    return {'method': method, 'fs': fs, 'max_gap': max_gap}
+
+
+def _record_cache(record, entry, cached, n_done, n_input):
+    """Adds 'cache': 'hit', 'append' or 'miss' to a stage's metrics record when the cache is on."""
+    if entry is not None:
+        record['cache'] = 'miss' if cached is None else 'hit' if n_done == n_input else 'append'
+
+
+def load_input(input_file, raw=True, dtype=np.float64):
+    """Loads a log for run_pipeline: (absolute time, (n_samples, n_channels) data).
+
+    Raw logs store time deltas, which are accumulated; resampled tables store absolute time.
+    Raw text logs go through the fast load_log parser (malformed lines are skipped with a warning).
+    data is allocated once in dtype (np.float32 for compact mode); time is always float64.
+    """
+    if raw and not is_binary(input_file):
+        table, bad_lines = load_log(input_file, columns=['time'] + CHANNELS)
+        report_bad_lines(input_file, bad_lines)
+    else:
+        table = load_table(input_file, columns=['time'] + CHANNELS)
+    time_sec = np.cumsum(table['time']) if raw else np.asarray(table['time'], dtype=np.float64)
+    data = np.empty((len(time_sec), len(CHANNELS)), dtype=dtype)
+    for j, name in enumerate(CHANNELS):
+        data[:, j] = table[name]
+    return time_sec, data
+
+
+def parse_stages(value):
+    stages = [stage.strip() for stage in value.split(',') if stage.strip()]
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"Unknown stage(s) {unknown}; choose from {', '.join(STAGES)}.")
+    return stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run resample -> filter -> analyze -> visualize in one process.')
+    parser.add_argument('--input', default=INPUT_FILE,
+                        help=f'Raw log, or resampled data if the resample stage is skipped (default: {INPUT_FILE}).')
+    parser.add_argument('--stages', type=parse_stages, default=list(STAGES),
+                        help=f"Comma-separated stages to run (default: {','.join(STAGES)}).")
+    parser.add_argument('--fs', type=float, default=TARGET_FS, help=f'Target sampling frequency in Hz (default: {TARGET_FS}).')
+    parser.add_argument('--cutoff', type=float, default=CUTOFF_FREQ, help=f'Low-pass cutoff in Hz (default: {CUTOFF_FREQ}).')
+    parser.add_argument('--order', type=int, default=FILTER_ORDER, help=f'FIR filter order (default: {FILTER_ORDER}).')
+    parser.add_argument('--window', default=WINDOW_TYPE, help=f'firwin window type (default: {WINDOW_TYPE}).')
+    parser.add_argument('--resample-method', choices=RESAMPLE_METHODS, default='interp',
+                        help="Resampling method (default: 'interp'; 'multistage' decimates high-rate input in stages).")
+    parser.add_argument('--filter-method', choices=FILTER_METHODS, default='filtfilt',
+                        help="Filtering method (default: 'filtfilt').")
+    parser.add_argument('--output-dir', default=OUTPUT_DIR, help=f'Directory for outputs (default: {OUTPUT_DIR}).')
+    parser.add_argument('--max-gap', type=float, default=None, metavar='SEC',
+                        help='Resample the stretches between gaps longer than SEC seconds separately and '
+                             'filter each on its own (interp only).')
+    parser.add_argument('--save-intermediates', action='store_true',
+                        help='Write resampled_data.f64 / filtered_data.f64 for the stages that run.')
+    parser.add_argument('--text', action='store_true', help='Also export saved intermediates as .txt.')
+    parser.add_argument('--float32', action='store_true',
+                        help='Compact mode: process the channels in float32 (error bounds in pipeline.py).')
+    parser.add_argument('--cache-dir', default=None,
+                        help=f'Stage result cache (default: {result_cache.CACHE_DIR} inside the output directory).')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Recompute every stage and rewrite every output, without reading or updating the cache.')
+    parser.add_argument('--quiet', action='store_true', help='Only print warnings and errors.')
+    parser.add_argument('--metrics', default=None,
+                        help="Append per-stage timing / memory records (JSON lines) to this file ('-' for stderr).")
+    parser.add_argument('--profile', choices=STAGES, default=None, help='Run this stage under cProfile.')
+    args = parser.parse_args()
+    if args.quiet:
+        set_quiet()
+    if args.metrics:
+        set_metrics_file(args.metrics)
+    if args.profile:
+        set_profile_stage(args.profile)
+    if not args.no_cache:
+        cache_dir = args.cache_dir or os.path.join(args.output_dir, result_cache.CACHE_DIR)
+        result_cache.set_cache_dir(cache_dir)
+        # Persisted filter designs spare an unchanged rerun the scipy import
+        set_disk_cache_dir(os.path.join(cache_dir, 'designs'))
+
+    if args.resample_method == 'polyphase' and 'resample' in args.stages and 'filter' in args.stages:
+        print(f"Note: polyphase resampling already applies the {args.cutoff} Hz low-pass; the filter stage runs on top of it.")
+
+    info(f"Loading data from {args.input}...")
+    try:
+        time_sec, data = load_input(args.input, raw='resample' in args.stages,
+                                    dtype=np.float32 if args.float32 else np.float64)
+    except FileNotFoundError:
+        print(f"Error: Input file '{args.input}' not found.")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error reading file: {e}")
+        sys.exit(1)
+    if len(time_sec) == 0:
+        print("Error: No data found in the file.")
+        sys.exit(1)
+    # Already-resampled input keeps the segment boundaries it was saved with
+    segments = load_segments(args.input) if 'resample' not in args.stages else None
+
+    try:
+        run_pipeline(time_sec, data, stages=args.stages, fs=args.fs, cutoff=args.cutoff,
+                     filter_order=args.order, window=args.window,
+                     resample_method=args.resample_method, filter_method=args.filter_method,
+                     output_dir=args.output_dir, save_intermediates=args.save_intermediates,
+                     text=args.text, max_gap=args.max_gap, segments=segments,
+                     source=os.path.abspath(args.input))
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    removed = result_cache.prune()
+    if removed:
+        info(f"Removed {removed} superseded result(s) from the cache.")
+
+    info("Pipeline finished.")
+
+
+if __name__ == '__main__':
+    main()
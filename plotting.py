@@ -0,0 +1,85 @@
+import matplotlib
+matplotlib.use('Agg')  # Files only: never pick an interactive backend, even with a display
+import matplotlib.pyplot as plt
+import numpy as np
+
+# --- Parameters ---
+FIGSIZE = (12, 8)  # Inches, as every stacked plot in the project used
+DPI = 100  # savefig resolution; with FIGSIZE this gives a 1200 px wide image
+MAX_POINTS_PER_PIXEL = 2  # Envelope decimation keeps one min and one max per pixel column
+# ------------------
+
+
+def decimate_envelope(x, y, n_bins=FIGSIZE[0] * DPI):
+    """Min/max decimation of a line to about 2 * n_bins points.
+
+    The samples are split into n_bins consecutive buckets and only each bucket's minimum
+    and maximum are kept (in their original order), so a line plotted at n_bins pixels
+    wide looks the same, spikes included. Short lines are returned unchanged.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    n = len(y)
+    if n <= MAX_POINTS_PER_PIXEL * n_bins:
+        return x, y
+
+    bucket = -(-n // n_bins)
+    n_full = -(-n // bucket)
+    # Pad the last bucket with its own final value so every bucket has the same length
+    padded = np.concatenate((y, np.full(n_full * bucket - n, y[-1])))
+    buckets = padded.reshape(n_full, bucket)
+    offsets = np.arange(n_full)[:, np.newaxis] * bucket
+    extremes = np.column_stack((np.argmin(buckets, axis=1), np.argmax(buckets, axis=1)))
+    idx = np.sort(np.minimum(extremes + offsets, n - 1), axis=1).ravel()
+    return x[idx], y[idx]
+
+
+class StackedPlot:
+    """A figure of vertically stacked, x-shared axes reused for every plot of that shape.
+
+    Creating a figure and its axes costs more than drawing a few thousand points, so
+    draw() clears and refills the same axes and saves them; call close() when done.
+    """
+
+    def __init__(self, nrows=2, figsize=FIGSIZE, dpi=DPI):
+        self.fig, self.axes = plt.subplots(nrows=nrows, ncols=1, figsize=figsize, dpi=dpi, sharex=True)
+        self.n_bins = int(figsize[0] * dpi)
+
+    def draw(self, title, panels, output_plot_file, xlabel='Time (s)'):
+        """Renders panels (one dict per axes) to output_plot_file; returns True on success.
+
+        Each panel has 'title', 'ylabel' and 'series', a list of (x, y, plot kwargs);
+        every series is envelope-decimated to the figure's pixel width first.
+        """
+        self.fig.suptitle(title, fontsize=16)
+        for ax, panel in zip(self.axes, panels):
+            ax.clear()
+            for x, y, style in panel['series']:
+                ax.plot(*decimate_envelope(x, y, self.n_bins), **style)
+            ax.set_ylabel(panel['ylabel'])
+            ax.set_title(panel['title'])
+            ax.grid(True)
+            ax.legend()
+        self.axes[-1].set_xlabel(xlabel)
+        self.fig.tight_layout(rect=[0, 0.03, 1, 0.95])
+
+        try:
+            self.fig.savefig(output_plot_file)
+            return True
+        except Exception as e:
+            print(f"Error saving plot: {e}")
+            return False
+
+    def close(self):
+        plt.close(self.fig)
+
+
+# One template per process, shared by all the time-series plots it renders
+_templates = {}
+
+
+def stacked_plot(nrows=2):
+    """The reusable StackedPlot with nrows axes for this process."""
+    if nrows not in _templates:
+        _templates[nrows] = StackedPlot(nrows)
+    return _templates[nrows]
@@ -1,86 +1,612 @@
-import pandas as pd
 import numpy as np
+import argparse
+import os
+from fractions import Fraction
+
+from data_io import (TableWriter, save_table, load_table, text_export_path, load_log, iter_log, report_bad_lines,
+                     segments_path, as_float_array)
+from instrumentation import stage
+from verbosity import set_quiet, is_quiet, info
 
 # --- Parameters ---
 INPUT_FILE = 'datates.txt'
-OUTPUT_FILE = 'resampled_data.txt'
+OUTPUT_FILE = 'resampled_data.f64'  # Binary table; .txt written only with --text
 TARGET_FS = 50.0  # Target sampling frequency in Hz
+CHUNK_BYTES = 4 * 2**20  # Bytes of raw log per block in streaming mode
+# Polyphase mode (same low-pass as apply_filter.py, applied while resampling)
+CUTOFF_FREQ = 10.0  # Cutoff frequency (Hz)
+FILTER_ORDER = 40  # Filter order per polyphase branch
+MAX_RATE_FACTOR = 1000  # Largest up/down factor used to approximate TARGET_FS / input rate
+UNIFORMITY_TOLERANCE = 0.1  # Max relative deviation of sample spacing before warning
+# Multistage decimation (--method multistage)
+MAX_STAGE_FACTOR = 8  # Largest decimation factor of one anti-alias stage
+TRANSITION_FACTOR = 3.3  # firwin Hamming design: transition width ~ 3.3 * fs / numtaps
+# Gap-aware mode (--max-gap)
+MAX_GAP_SEC = 1.0  # Gaps longer than this split the recording into separately resampled segments
 # ------------------
 
-print(f"Loading data from {INPUT_FILE}...")
-try:
-    # Read data, keeping default index
-    df = pd.read_csv(INPUT_FILE, sep='\t', header=0)
-    print("File read successfully. First 5 rows:")
-    print(df.head().to_string())
-except FileNotFoundError:
-    print(f"Error: Input file '{INPUT_FILE}' not found.")
-    exit()
-except Exception as e:
-    print(f"Error reading file: {e}")
-    exit()
-
-if 'time' not in df.columns:
-    print(f"Error: Column 'time' not found in {INPUT_FILE}.")
-    exit()
-
-# Calculate cumulative time (as float seconds)
-df['cumulative_time'] = df['time'].cumsum()
-original_time_sec = df['cumulative_time'].values
-original_xaccel = df['xaccel'].values
-original_yaccel = df['yaccel'].values
-
-print("\n--- DEBUG: Original Time and Accel (first 10) ---")
-print("Time (s):", original_time_sec[:10])
-print("X Accel:", original_xaccel[:10])
-print("--- END DEBUG ---")
-
-# Define target time points in seconds
-target_period_sec = 1.0 / TARGET_FS
-start_time_sec = original_time_sec[0]
-end_time_sec = original_time_sec[-1]
-target_time_sec = np.arange(start_time_sec, end_time_sec, target_period_sec)
-
-print(f"\nResampling data to {TARGET_FS} Hz using np.interp...")
-
-# Interpolate using numpy
-resampled_xaccel = np.interp(target_time_sec, original_time_sec, original_xaccel)
-resampled_yaccel = np.interp(target_time_sec, original_time_sec, original_yaccel)
-
-print("\n--- DEBUG: Resampled values (first 10) ---")
-print("Time (s):", target_time_sec[:10])
-print("X Accel:", resampled_xaccel[:10])
-print("Y Accel:", resampled_yaccel[:10])
-print("--- END DEBUG ---")
-
-# Create the final DataFrame
-resampled_df = pd.DataFrame({
-    'time': target_time_sec,
-    'xaccel': resampled_xaccel,
-    'yaccel': resampled_yaccel
-})
-
-print(f"\nSaving resampled data to {OUTPUT_FILE}...")
-try:
-    resampled_df.to_csv(OUTPUT_FILE, sep='\t', index=False, float_format='%.9f', header=True)
-    print("Save complete.")
-except Exception as e:
-    print(f"Error saving file: {e}")
-    exit()
-
-print("\n--- Verification Step ---")
-try:
-    print(f"Reading back {OUTPUT_FILE} for verification...")
-    df_verify = pd.read_csv(OUTPUT_FILE, sep='\t', header=0)
-    print("File read back successfully.")
-    print("\n--- DEBUG: Data AFTER reading back (first 10 rows) ---")
-    print(df_verify.head(10).to_string())
-    print("--- END DEBUG ---")
-except Exception as e:
-    print(f"Error reading back file for verification: {e}")
+
+# --- Linear Resampler ---
+def resample_interp(original_time_sec, data, target_fs=TARGET_FS, start_row=0):
+    """Linear (np.interp) resampling onto a uniform target_fs grid from the first to the last sample.
+
+    data is (n_samples,) or (n_samples, n_channels); float32 data gives float32 output
+    (time stays float64). Returns (target_time_sec, resampled_data).
+    start_row returns only the grid points from that row on. Points before an earlier
+    last sample only interpolate between earlier samples, so when rows are appended to
+    a recording, the earlier result stays valid and only this tail has to be computed.
+    """
+    original_time_sec = np.asarray(original_time_sec, dtype=np.float64)
+    data = as_float_array(data)
+
+    # Define target time points in seconds
+    target_period_sec = 1.0 / target_fs
+    start_time_sec = original_time_sec[0]
+    end_time_sec = original_time_sec[-1]
+    if start_row:
+        n_points = max(int(np.ceil((end_time_sec - start_time_sec) / target_period_sec)), start_row)
+        target_time_sec = _target_times(start_time_sec, target_period_sec, start_row, n_points)
+    else:
+        target_time_sec = np.arange(start_time_sec, end_time_sec, target_period_sec)
+
+    # Interpolate using numpy, one channel at a time
+    if data.ndim == 1:
+        return target_time_sec, np.interp(target_time_sec, original_time_sec, data).astype(data.dtype, copy=False)
+    resampled = np.empty((len(target_time_sec), data.shape[1]), dtype=data.dtype)
+    for channel in range(data.shape[1]):
+        resampled[:, channel] = np.interp(target_time_sec, original_time_sec, data[:, channel])
+    return target_time_sec, resampled
 # ------------------------
 
-print(f"\nResampling and verification complete. Resampled data has {len(resampled_df)} points.")
 
-# print("\nFirst 5 rows of resampled data:")
-# print(resampled_df.head().to_string()) # Commented out, replaced by verification step 
\ No newline at end of file
+# --- Gap-aware Resampler ---
+def find_segments(time_sec, max_gap_sec=MAX_GAP_SEC):
+    """(start, stop) sample indices of the runs whose consecutive samples are at most max_gap_sec apart."""
+    breaks = np.flatnonzero(np.diff(time_sec) > max_gap_sec) + 1
+    starts = np.concatenate(([0], breaks))
+    stops = np.concatenate((breaks, [len(time_sec)]))
+    return starts, stops
+
+
+def resample_segments(original_time_sec, data, target_fs=TARGET_FS, max_gap_sec=MAX_GAP_SEC):
+    """Linear resampling that leaves gaps longer than max_gap_sec empty instead of filling them.
+
+    Out-of-order timestamps are sorted first (np.interp needs increasing times). Each
+    contiguous segment gets its own target_fs grid starting at its first sample, exactly
+    as resample_interp would produce for that segment alone, and all segments are then
+    interpolated in one np.interp pass per channel: grid points never fall inside a gap,
+    so no interpolation bracket spans one.
+    Returns (target_time_sec, resampled_data, segments); segments is a table with one
+    row per segment (start / end time, first output row, output and input row counts).
+    """
+    original_time_sec = np.asarray(original_time_sec, dtype=np.float64)
+    data = as_float_array(data)
+    if len(original_time_sec) == 0:
+        raise ValueError("No samples to resample.")
+
+    if np.any(np.diff(original_time_sec) < 0):
+        order = np.argsort(original_time_sec, kind='stable')
+        n_moved = np.count_nonzero(order != np.arange(len(order)))
+        print(f"Warning: {n_moved} samples were out of time order and have been sorted.")
+        original_time_sec = original_time_sec[order]
+        data = data[order]
+
+    starts, stops = find_segments(original_time_sec, max_gap_sec)
+    start_time_sec = original_time_sec[starts]
+    end_time_sec = original_time_sec[stops - 1]
+
+    # Per-segment grids, built like np.arange(start, end, period) (see _target_times)
+    target_period_sec = 1.0 / target_fs
+    counts = np.maximum(0, np.ceil((end_time_sec - start_time_sec) / target_period_sec)).astype(np.int64)
+    first_row = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    segment_of_row = np.repeat(np.arange(len(counts)), counts)
+    index_in_segment = np.arange(counts.sum()) - first_row[segment_of_row]
+    delta = (start_time_sec + target_period_sec) - start_time_sec
+    target_time_sec = start_time_sec[segment_of_row] + index_in_segment * delta[segment_of_row]
+    second = index_in_segment == 1
+    target_time_sec[second] = (start_time_sec + target_period_sec)[segment_of_row[second]]
+
+    if data.ndim == 1:
+        resampled = np.interp(target_time_sec, original_time_sec, data).astype(data.dtype, copy=False)
+    else:
+        resampled = np.empty((len(target_time_sec), data.shape[1]), dtype=data.dtype)
+        for channel in range(data.shape[1]):
+            resampled[:, channel] = np.interp(target_time_sec, original_time_sec, data[:, channel])
+
+    segments = {
+        'start_time': start_time_sec,
+        'end_time': end_time_sec,
+        'first_row': first_row,
+        'n_rows': counts,
+        'n_input': stops - starts,
+    }
+    return target_time_sec, resampled, segments
+# ----------------------------
+
+
+# --- Streaming Resampler ---
+def _target_count(start_time_sec, end_time_sec, target_period_sec):
+    """Number of target points np.arange(start, end, period) would produce."""
+    return max(0, int(np.ceil((end_time_sec - start_time_sec) / target_period_sec)))
+
+
+def _target_times(start_time_sec, target_period_sec, first_idx, last_idx):
+    """Target time points first_idx..last_idx-1, computed exactly like np.arange."""
+    # np.arange fills element i as start + i * (buffer[1] - buffer[0])
+    delta = (start_time_sec + target_period_sec) - start_time_sec
+    target_time_sec = start_time_sec + np.arange(first_idx, last_idx) * delta
+    if first_idx <= 1 < last_idx:
+        target_time_sec[1 - first_idx] = start_time_sec + target_period_sec
+    return target_time_sec
+
+
+def _write_rows(writers, target_time_sec, resampled_xaccel, resampled_yaccel):
+    for writer in writers:
+        writer.write({
+            'time': target_time_sec,
+            'xaccel': resampled_xaccel,
+            'yaccel': resampled_yaccel
+        })
+
+
+class StreamingResampler:
+    """Incremental np.interp resampling: feed blocks of raw samples, get the finished target points.
+
+    Blocks carry time deltas (as in the raw logs) and (n, n_channels) values. A target
+    point is emitted once a later sample brackets it; flush() emits the rest up to the
+    last sample. The points are exactly those resample_interp() gives for all the input
+    at once. flush() does not end the stream, so a feed can pause and resume.
+    """
+
+    def __init__(self, target_fs=TARGET_FS, n_channels=2):
+        self.target_period_sec = 1.0 / target_fs
+        self.time_offset = 0.0  # Cumulative time at the end of the previous block
+        self.start_time_sec = None
+        self.next_idx = 0  # Index of the next target point to emit
+        self.n_written = 0
+        # Samples carried over from the previous block (bracket of the next target onwards)
+        self._carry_t = np.empty(0)
+        self._carry = np.empty((0, n_channels))
+
+    def _emit(self, last_idx, known_t, known, cut_at=None):
+        if last_idx <= self.next_idx:
+            return np.empty(0), np.empty((0, known.shape[1]), dtype=known.dtype)
+        target_time_sec = _target_times(self.start_time_sec, self.target_period_sec, self.next_idx, last_idx)
+        if cut_at is not None:
+            target_time_sec = target_time_sec[:np.searchsorted(target_time_sec, cut_at, side='left')]
+        resampled = np.empty((len(target_time_sec), known.shape[1]), dtype=known.dtype)
+        for channel in range(known.shape[1]):
+            resampled[:, channel] = np.interp(target_time_sec, known_t, known[:, channel])
+        self.next_idx += len(target_time_sec)
+        self.n_written += len(target_time_sec)
+        return target_time_sec, resampled
+
+    def _keep_bracket(self, known_t, known):
+        """Carries the bracket of the next target and everything after it."""
+        next_time_sec = _target_times(self.start_time_sec, self.target_period_sec, self.next_idx, self.next_idx + 1)[0]
+        keep_from = max(0, np.searchsorted(known_t, next_time_sec, side='right') - 1)
+        self._carry_t = known_t[keep_from:]
+        self._carry = known[keep_from:]
+
+    def update(self, time_delta, data):
+        """Adds samples; returns (target_time_sec, resampled (k, n_channels)) for the targets now bracketed."""
+        data = np.asarray(data).reshape(len(time_delta), -1)
+        if len(time_delta) == 0:
+            return self._emit(0, self._carry_t, self._carry)
+        # Sequential cumulative sum seeded with the carried offset (same rounding as cumsum())
+        cumulative_time = np.cumsum(np.concatenate(([self.time_offset], time_delta)))[1:]
+        self.time_offset = cumulative_time[-1]
+        if self.start_time_sec is None:
+            self.start_time_sec = cumulative_time[0]
+
+        known_t = np.concatenate((self._carry_t, cumulative_time))
+        known = np.concatenate((self._carry.astype(data.dtype, copy=False), data))
+        # Emit targets strictly before the last known sample, so each one is fully bracketed
+        last_idx = _target_count(self.start_time_sec, known_t[-1], self.target_period_sec)
+        result = self._emit(last_idx, known_t, known, cut_at=known_t[-1])
+        self._keep_bracket(known_t, known)
+        return result
+
+    def flush(self):
+        """Emits the remaining targets up to the last sample seen so far."""
+        if self.start_time_sec is None:
+            return self._emit(0, self._carry_t, self._carry)
+        last_idx = _target_count(self.start_time_sec, self._carry_t[-1], self.target_period_sec)
+        result = self._emit(last_idx, self._carry_t, self._carry)
+        self._keep_bracket(self._carry_t, self._carry)
+        return result
+
+
+def resample_streaming(input_file, output_file, target_fs=TARGET_FS, chunk_bytes=CHUNK_BYTES,
+                       text_export_file=None):
+    """Resamples input_file block by block, writing output incrementally in constant memory.
+
+    Blocks go through the same parser as load_log (data_io.iter_log), so the output is
+    bit-identical to the whole-file resampling path. Output format is chosen by
+    extension (see data_io.py); text_export_file optionally gets a .txt copy.
+    """
+    resampler = StreamingResampler(target_fs, n_channels=2)
+    writers = [TableWriter(path, ['time', 'xaccel', 'yaccel'])
+               for path in [output_file, text_export_file] if path is not None]
+    bad_lines = []
+    try:
+        for block, block_bad in iter_log(input_file, columns=['time', 'xaccel', 'yaccel'], block_bytes=chunk_bytes):
+            bad_lines.extend(block_bad)
+            if len(block['time']) == 0:
+                continue
+            target_time_sec, resampled = resampler.update(
+                block['time'], np.column_stack((block['xaccel'], block['yaccel'])))
+            if len(target_time_sec) > 0:
+                _write_rows(writers, target_time_sec, resampled[:, 0], resampled[:, 1])
+
+        # Flush the remaining targets now that the end time is known
+        target_time_sec, resampled = resampler.flush()
+        if len(target_time_sec) > 0:
+            _write_rows(writers, target_time_sec, resampled[:, 0], resampled[:, 1])
+    finally:
+        for writer in writers:
+            writer.close()
+    report_bad_lines(input_file, bad_lines)
+
+    return resampler.n_written
+# ---------------------------
+
+
+# --- Polyphase Resampler ---
+def _uniform_rate(original_time_sec, method_name):
+    """Input rate from the median sample spacing; warns when the grid is far from uniform."""
+    spacing = np.diff(original_time_sec)
+    input_period_sec = np.median(spacing)
+    if input_period_sec <= 0:
+        raise ValueError("Median sample spacing is not positive; use the interp method.")
+    deviation = np.max(np.abs(spacing - input_period_sec)) / input_period_sec
+    if deviation > UNIFORMITY_TOLERANCE:
+        print(f"Warning: sample spacing deviates up to {100 * deviation:.0f}% from the median; "
+              f"{method_name} assumes a uniform input grid.")
+    return 1.0 / input_period_sec
+
+
+def resample_polyphase(original_time_sec, data, target_fs=TARGET_FS, cutoff=CUTOFF_FREQ,
+                       filter_order=FILTER_ORDER, window='hamming'):
+    """Rational-rate resampling of nearly uniform samples with the low-pass folded in.
+
+    The input rate is taken from the median sample spacing and target_fs / input rate is
+    approximated as up/down. One firwin low-pass (design_lowpass from filter_design.py) at
+    the upsampled rate does both the interpolation and the anti-aliasing, applied with
+    scipy's polyphase upfirdn. data is (n_samples,) or (n_samples, n_channels).
+    Returns (target_time_sec, resampled_data).
+    """
+    from scipy import signal
+    from filter_design import design_lowpass
+
+    original_time_sec = np.asarray(original_time_sec, dtype=np.float64)
+    data = as_float_array(data)
+    n_in = len(data)
+    if n_in < 2:
+        raise ValueError("Polyphase resampling needs at least two samples.")
+
+    input_fs = _uniform_rate(original_time_sec, 'polyphase resampling')
+    ratio = Fraction(target_fs / input_fs).limit_denominator(MAX_RATE_FACTOR)
+    up, down = ratio.numerator, ratio.denominator
+
+    # One low-pass at the upsampled rate: below both Nyquist limits and the requested cutoff
+    cutoff = min(cutoff, 0.5 * min(input_fs, target_fs))
+    half_len = (filter_order // 2) * max(up, down)
+    h = design_lowpass(input_fs * up, cutoff, 2 * half_len + 1, window=window) * up
+
+    # Pad the filter so output samples land on the input grid despite the group delay
+    n_out = -(-n_in * up // down)
+    n_pre_pad = down - half_len % down
+    n_pre_remove = (half_len + n_pre_pad) // down
+    needed_len = (n_out + n_pre_remove - 1) * down - (n_in - 1) * up + 1
+    n_post_pad = max(0, needed_len - (len(h) + n_pre_pad))
+    h = np.concatenate((np.zeros(n_pre_pad), h, np.zeros(n_post_pad)))
+
+    resampled = signal.upfirdn(h.astype(data.dtype), data, up, down, axis=0)[n_pre_remove : n_pre_remove + n_out]
+    target_time_sec = original_time_sec[0] + np.arange(n_out) * (1.0 / target_fs)
+    return target_time_sec, resampled
+# ---------------------------
+
+
+# --- Multistage Decimator ---
+def plan_decimation(input_fs, target_fs=TARGET_FS, max_stage_factor=MAX_STAGE_FACTOR):
+    """Integer decimation factors (largest first) that take input_fs down to about target_fs.
+
+    The total factor is the largest one not above input_fs / target_fs whose prime factors
+    all fit in a stage of at most max_stage_factor; whatever rate ratio remains is left
+    for a final rational step. Returns [] when the input is not faster than target_fs.
+    """
+    total = int(np.floor(input_fs / target_fs * (1 + 1e-9)))
+    while total > 1:
+        primes, rest, p = [], total, 2
+        while p * p <= rest:
+            while rest % p == 0:
+                primes.append(p)
+                rest //= p
+            p += 1
+        if rest > 1:
+            primes.append(rest)
+        if max(primes) <= max_stage_factor:
+            break
+        total -= 1
+    if total <= 1:
+        return []
+
+    # First-fit decreasing: pack the prime factors into as few stages as possible
+    factors = []
+    for p in sorted(primes, reverse=True):
+        for i, factor in enumerate(factors):
+            if factor * p <= max_stage_factor:
+                factors[i] *= p
+                break
+        else:
+            factors.append(p)
+    return sorted(factors, reverse=True)
+
+
+def design_decimation_stages(input_fs, factors, passband, window='hamming'):
+    """One firwin low-pass per decimation stage: [(factor, coeffs), ...].
+
+    A stage only has to keep 0..passband free of aliases, so its transition band runs
+    from passband to (output rate - passband) with the cutoff at the output Nyquist.
+    Early stages, whose output rate is still far above passband, need only a few taps.
+    """
+    from filter_design import design_lowpass
+
+    stages = []
+    fs = input_fs
+    for factor in factors:
+        out_fs = fs / factor
+        transition = out_fs - 2 * passband
+        numtaps = int(np.ceil(TRANSITION_FACTOR * fs / transition)) | 1  # Odd: integer group delay
+        stages.append((factor, design_lowpass(fs, out_fs / 2, numtaps, window=window)))
+        fs = out_fs
+    return stages
+
+
+def _decimate(data, coeffs, factor):
+    """Zero-phase-aligned FIR decimation: output m is the filter centred on input m * factor."""
+    from scipy import signal
+
+    delay = (len(coeffs) - 1) // 2
+    n_pre_pad = -delay % factor
+    h = np.concatenate((np.zeros(n_pre_pad), coeffs))
+    n_out = -(-len(data) // factor)
+    first = (delay + n_pre_pad) // factor
+    # upfirdn only computes the outputs that are kept (polyphase), ~taps / factor multiplies per input
+    return signal.upfirdn(h.astype(data.dtype), data, 1, factor, axis=0)[first : first + n_out]
+
+
+def decimate_multistage(original_time_sec, data, target_fs=TARGET_FS, cutoff=CUTOFF_FREQ,
+                        window='hamming', max_stage_factor=MAX_STAGE_FACTOR):
+    """Brings high-rate (e.g. 1-4 kHz), nearly uniform input down to target_fs in stages.
+
+    A cascade of short firwin anti-alias filters (plan_decimation / design_decimation_stages)
+    each keeps 0..cutoff clean while dropping the rate, so the total cost is a few
+    multiplies per input sample instead of the thousands of taps a cutoff-Hz filter
+    needs at the input rate. If target_fs does not divide the input rate, a final
+    resample_polyphase step (cutoff at its Nyquist) lands on target_fs exactly. The
+    output is band-limited to target_fs / 2, not to cutoff: the main filter still runs.
+    Returns (target_time_sec, resampled_data).
+    """
+    original_time_sec = np.asarray(original_time_sec, dtype=np.float64)
+    data = as_float_array(data)
+    if len(data) < 2:
+        raise ValueError("Multistage decimation needs at least two samples.")
+    input_fs = _uniform_rate(original_time_sec, 'multistage decimation')
+    if input_fs < target_fs * (1 - 1e-9):
+        raise ValueError(f"Input rate {input_fs:.4g} Hz is below the target {target_fs} Hz; "
+                         "multistage decimation only reduces the rate.")
+
+    passband = min(cutoff, 0.4 * target_fs)
+    factors = plan_decimation(input_fs, target_fs, max_stage_factor)
+    stages = design_decimation_stages(input_fs, factors, passband, window)
+
+    fs = input_fs
+    time_sec = original_time_sec[0] + np.arange(len(data)) / input_fs
+    rates = [f"{input_fs:.6g}"]
+    multiplies = 0.0
+    decimation = 1
+    for factor, coeffs in stages:
+        data = _decimate(data, coeffs, factor)
+        multiplies += len(coeffs) / (decimation * factor)
+        decimation *= factor
+        fs /= factor
+        time_sec = time_sec[::factor]
+        rates.append(f"{fs:.6g}")
+
+    if abs(fs - target_fs) > 1e-9 * target_fs:
+        time_sec, data = resample_polyphase(time_sec, data, target_fs, target_fs / 2, FILTER_ORDER, window)
+        rates.append(f"{target_fs:.6g}")
+    info(f"Decimating {' -> '.join(rates)} Hz in {len(stages)} stage(s), "
+         f"taps {'/'.join(str(len(coeffs)) for _, coeffs in stages) or '-'} "
+         f"(~{multiplies:.1f} multiplies per input sample and channel).")
+    return time_sec, data
+# ----------------------------
+
+
+def main():
+    parser = argparse.ArgumentParser(description=f'Resample {INPUT_FILE} to {TARGET_FS} Hz.')
+    parser.add_argument('--stream', action='store_true',
+                        help='Read the input in fixed-size chunks with constant memory use.')
+    parser.add_argument('--chunk-bytes', type=int, default=CHUNK_BYTES,
+                        help=f'Bytes of input per block in streaming mode (default: {CHUNK_BYTES}).')
+    parser.add_argument('--text', action='store_true',
+                        help=f'Also export the result as text ({text_export_path(OUTPUT_FILE)}).')
+    parser.add_argument('--method', choices=('interp', 'polyphase', 'multistage'), default='interp',
+                        help="'interp' (linear np.interp, default), 'polyphase' (rational resampling "
+                             f"with the {CUTOFF_FREQ} Hz low-pass applied in the same pass) or 'multistage' "
+                             "(cascade of short anti-alias FIR stages for high-rate, e.g. 1-4 kHz, input).")
+    parser.add_argument('--quiet', action='store_true',
+                        help='Production mode: skip the debug dumps and the verification read-back.')
+    parser.add_argument('--max-gap', type=float, nargs='?', const=MAX_GAP_SEC, default=None, metavar='SEC',
+                        help='Resample each stretch between gaps longer than SEC seconds separately instead of '
+                             f'interpolating across the gap (default when given without a value: {MAX_GAP_SEC}); '
+                             f'segment boundaries are saved to {segments_path(OUTPUT_FILE)}.')
+    args = parser.parse_args()
+    if args.quiet:
+        set_quiet()
+
+    if args.stream and args.method != 'interp':
+        parser.error('--stream only supports the interp method.')
+    if args.max_gap is not None and (args.stream or args.method != 'interp'):
+        parser.error('--max-gap only supports the in-memory interp method.')
+    if args.max_gap is not None and args.max_gap <= 0:
+        parser.error('--max-gap must be positive.')
+
+    text_file = None
+    if args.text and text_export_path(OUTPUT_FILE) != OUTPUT_FILE:
+        text_file = text_export_path(OUTPUT_FILE)
+
+    if args.stream:
+        print(f"Streaming {INPUT_FILE} to {OUTPUT_FILE} at {TARGET_FS} Hz ({args.chunk_bytes} bytes per block)...")
+        try:
+            with stage('resample_stream', chunk_bytes=args.chunk_bytes) as record:
+                n_points = resample_streaming(INPUT_FILE, OUTPUT_FILE, TARGET_FS, args.chunk_bytes,
+                                              text_export_file=text_file)
+                record['n_samples'] = n_points
+        except FileNotFoundError:
+            print(f"Error: Input file '{INPUT_FILE}' not found.")
+            exit()
+        except Exception as e:
+            print(f"Error during streaming resampling: {e}")
+            exit()
+        print(f"\nStreaming resampling complete. Resampled data has {n_points} points.")
+        return
+
+    print(f"Loading data from {INPUT_FILE}...")
+    try:
+        # x / y are only parsed when the debug preview below shows them
+        with stage('load') as record:
+            df, bad_lines = load_log(INPUT_FILE, columns=['time', 'xaccel', 'yaccel'] if is_quiet() else None)
+            record['n_samples'] = len(df['time']) if 'time' in df else 0
+        report_bad_lines(INPUT_FILE, bad_lines)
+        if not is_quiet():
+            import pandas as pd
+            print("File read successfully. First 5 rows:")
+            print(pd.DataFrame(df).head().to_string())
+    except FileNotFoundError:
+        print(f"Error: Input file '{INPUT_FILE}' not found.")
+        exit()
+    except Exception as e:
+        print(f"Error reading file: {e}")
+        exit()
+
+    if 'time' not in df:
+        print(f"Error: Column 'time' not found in {INPUT_FILE}.")
+        exit()
+
+    # Calculate cumulative time (as float seconds)
+    original_time_sec = np.cumsum(df['time'])
+    original_xaccel = df['xaccel']
+    original_yaccel = df['yaccel']
+
+    if not is_quiet():
+        print("\n--- DEBUG: Original Time and Accel (first 10) ---")
+        print("Time (s):", original_time_sec[:10])
+        print("X Accel:", original_xaccel[:10])
+        print("--- END DEBUG ---")
+
+    segments = None
+    if args.method == 'polyphase':
+        print(f"\nResampling data to {TARGET_FS} Hz using polyphase filtering (cutoff {CUTOFF_FREQ} Hz)...")
+        try:
+            with stage('resample', len(original_time_sec), method='polyphase'):
+                target_time_sec, resampled = resample_polyphase(
+                    original_time_sec, np.column_stack((original_xaccel, original_yaccel)), TARGET_FS)
+        except ValueError as e:
+            print(f"Error during polyphase resampling: {e}")
+            exit()
+        resampled_xaccel = resampled[:, 0]
+        resampled_yaccel = resampled[:, 1]
+    elif args.method == 'multistage':
+        print(f"\nDecimating data to {TARGET_FS} Hz in stages (passband {CUTOFF_FREQ} Hz)...")
+        try:
+            with stage('resample', len(original_time_sec), method='multistage'):
+                target_time_sec, resampled = decimate_multistage(
+                    original_time_sec, np.column_stack((original_xaccel, original_yaccel)), TARGET_FS)
+        except ValueError as e:
+            print(f"Error during multistage decimation: {e}")
+            exit()
+        resampled_xaccel = resampled[:, 0]
+        resampled_yaccel = resampled[:, 1]
+    elif args.max_gap is not None:
+        print(f"\nResampling data to {TARGET_FS} Hz using np.interp, splitting at gaps over {args.max_gap} s...")
+        with stage('resample', len(original_time_sec), method='segments'):
+            target_time_sec, resampled, segments = resample_segments(
+                original_time_sec, np.column_stack((original_xaccel, original_yaccel)), TARGET_FS, args.max_gap)
+        print(f"Found {len(segments['n_rows'])} segment(s).")
+        resampled_xaccel = resampled[:, 0]
+        resampled_yaccel = resampled[:, 1]
+    else:
+        n_gaps = np.count_nonzero(np.diff(original_time_sec) > MAX_GAP_SEC)
+        if n_gaps:
+            print(f"Warning: {n_gaps} gap(s) longer than {MAX_GAP_SEC} s will be filled by interpolation; "
+                  "use --max-gap to resample the segments separately.")
+        print(f"\nResampling data to {TARGET_FS} Hz using np.interp...")
+        with stage('resample', len(original_time_sec), method='interp'):
+            target_time_sec, resampled = resample_interp(
+                original_time_sec, np.column_stack((original_xaccel, original_yaccel)), TARGET_FS)
+        resampled_xaccel = resampled[:, 0]
+        resampled_yaccel = resampled[:, 1]
+
+    if not is_quiet():
+        print("\n--- DEBUG: Resampled values (first 10) ---")
+        print("Time (s):", target_time_sec[:10])
+        print("X Accel:", resampled_xaccel[:10])
+        print("Y Accel:", resampled_yaccel[:10])
+        print("--- END DEBUG ---")
+
+    # Collect the final table
+    resampled_table = {
+        'time': target_time_sec,
+        'xaccel': resampled_xaccel,
+        'yaccel': resampled_yaccel
+    }
+
+    print(f"\nSaving resampled data to {OUTPUT_FILE}...")
+    try:
+        with stage('save', len(target_time_sec)):
+            save_table(OUTPUT_FILE, resampled_table)
+            if text_file is not None:
+                save_table(text_file, resampled_table)
+            # Stale metadata would make apply_filter split a table resampled without gaps
+            if segments is not None:
+                save_table(segments_path(OUTPUT_FILE), segments)
+            elif os.path.exists(segments_path(OUTPUT_FILE)):
+                os.remove(segments_path(OUTPUT_FILE))
+        if segments is not None:
+            print(f"Segment boundaries written to {segments_path(OUTPUT_FILE)}.")
+        if text_file is not None:
+            print(f"Text export written to {text_file}.")
+        print("Save complete.")
+    except Exception as e:
+        print(f"Error saving file: {e}")
+        exit()
+
+    if is_quiet():
+        print(f"Resampling complete. Resampled data has {len(target_time_sec)} points.")
+        return
+
+    print("\n--- Verification Step ---")
+    try:
+        import pandas as pd
+        print(f"Reading back {OUTPUT_FILE} for verification...")
+        with stage('verify', len(target_time_sec)):
+            df_verify = pd.DataFrame(load_table(OUTPUT_FILE))
+        print("File read back successfully.")
+        print("\n--- DEBUG: Data AFTER reading back (first 10 rows) ---")
+        print(df_verify.head(10).to_string())
+        print("--- END DEBUG ---")
+    except Exception as e:
+        print(f"Error reading back file for verification: {e}")
+    # ------------------------
+
+    print(f"\nResampling and verification complete. Resampled data has {len(target_time_sec)} points.")
+
+    # print("\nFirst 5 rows of resampled data:")
+    # print(pd.DataFrame(resampled_table).head().to_string()) # Commented out, replaced by verification step
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+"""Stage result cache used by pipeline.py and batch.py.
+
+Only run_pipeline() (and so batch.py) reads and writes it. The single-step scripts
+(resample_data.py, apply_filter.py, apply_filter_manual.py, analyze_frequency.py)
+stay uncached reference implementations: they recompute and redraw on every run.
+Use pipeline.py to skip unchanged stages.
+"""
+import numpy as np
+import hashlib
+import json
+import os
+
+# --- Parameters ---
+CACHE_DIR_ENV = 'PIPELINE_CACHE_DIR'  # Directory of the stage result cache; unset = off
+CACHE_DIR = '.pipeline_cache'  # Name the scripts use inside their output directory
+CACHE_VERSION = 1  # Part of every key; bump when a stage's algorithm or stored layout changes
+# ------------------
+#
+# Every stage result is addressed by a key: sha256 of the stage name, its parameters and
+# the digest of its input arrays. objects/<key>.npz holds the result arrays. latest/
+# remembers, per recording (source), stage and parameter set, the newest key with its
+# input's row count and digest, so a recording that only had rows appended can find
+# the result of its prefix and recompute just the tail. outputs/ stamps the files a
+# result was written to (key, size, mtime), so unchanged outputs are not rewritten.
+
+_cache_dir = os.environ.get(CACHE_DIR_ENV) or None
+
+
+def set_cache_dir(directory):
+    """Enables the result cache in directory (None disables it)."""
+    global _cache_dir
+    _cache_dir = directory
+
+
+def is_enabled():
+    return _cache_dir is not None
+
+
+def _json_default(value):
+    if isinstance(value, np.ndarray):
+        return array_digest(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    return repr(value)
+
+
+def _hash_json(value):
+    text = json.dumps(value, sort_keys=True, default=_json_default)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def array_digest(*arrays):
+    """sha256 (hex) of the dtype, shape and contents of each array."""
+    digest = hashlib.sha256()
+    for values in arrays:
+        values = np.ascontiguousarray(values)
+        digest.update(f'{values.dtype.str}{values.shape};'.encode('utf-8'))
+        digest.update(values.reshape(-1).view(np.uint8))
+    return digest.hexdigest()
+
+
+def stage_key(stage, params, input_digest):
+    """Content address of a stage result (params may hold arrays, e.g. filter coefficients)."""
+    return _hash_json({'version': CACHE_VERSION, 'stage': stage, 'params': params, 'input': input_digest})
+
+
+def _path(kind, name, extension):
+    return os.path.join(_cache_dir, kind, name + extension)
+
+
+def _write_atomic(path, write):
+    """Writes path through a temporary file, so readers never see half a file."""
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Warning: could not write cache entry {path}: {e}")
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _load(key):
+    """Result arrays stored under key, or None."""
+    try:
+        with np.load(_path('objects', key, '.npz')) as stored:
+            return {name: stored[name] for name in stored.files}
+    except Exception:
+        return None  # Missing or corrupt entries are simply recomputed
+
+
+def lookup(stage, params, inputs, source=None, extendable=False, digest=None):
+    """Finds the stored result of a stage for inputs (arrays with rows along axis 0).
+
+    Returns (entry, arrays, n_done). entry is passed to store() after a miss; arrays is
+    the stored result (None on a miss) and n_done the number of input rows it covers.
+    On an exact hit n_done == len(inputs[0]). With extendable set, the newest result of
+    source for this stage and parameters is also returned when its input is a prefix
+    of inputs (rows were appended), so the caller only has to compute the rest.
+    digest skips hashing inputs when the caller already knows array_digest(*inputs).
+    An exact hit also becomes source's newest result, so prune() keeps it. With the
+    cache off, or without a source (nothing would keep the result), returns (None, None, 0).
+    """
+    if _cache_dir is None or source is None:
+        return None, None, 0
+    n_rows = len(inputs[0]) if inputs else 0
+    entry = {'stage': stage, 'params': params, 'source': source, 'n_input': n_rows,
+             'input_digest': digest or array_digest(*inputs)}
+    entry['key'] = stage_key(stage, params, entry['input_digest'])
+    previous = _read_json(_latest_path(entry))
+    arrays = _load(entry['key'])
+    if arrays is not None:
+        if previous != _pointer(entry):
+            _write_pointer(entry)
+        return entry, arrays, n_rows
+
+    if extendable and previous is not None and 0 < previous['n_input'] < n_rows:
+        n_done = previous['n_input']
+        if array_digest(*(values[:n_done] for values in inputs)) == previous['input_digest']:
+            arrays = _load(previous['key'])
+            if arrays is not None:
+                return entry, arrays, n_done
+    return entry, None, 0
+
+
+def store(entry, **arrays):
+    """Saves a stage result found missing by lookup() and makes it its source's newest."""
+    if entry is None or _cache_dir is None:
+        return
+    _write_atomic(_path('objects', entry['key'], '.npz'), lambda f: np.savez(f, **arrays))
+    _write_pointer(entry)
+
+
+def _latest_path(entry):
+    return _path('latest', _hash_json([entry['source'], entry['stage'], entry['params']]), '.json')
+
+
+def _pointer(entry):
+    return {name: entry[name] for name in ('key', 'n_input', 'input_digest')}
+
+
+def _write_pointer(entry):
+    pointer = json.dumps(_pointer(entry)).encode('utf-8')
+    _write_atomic(_latest_path(entry), lambda f: f.write(pointer))
+
+
+def _output_stamp_path(path):
+    return _path('outputs', _hash_json(os.path.abspath(path)), '.json')
+
+
+def is_current(path, key):
+    """True if path was last written from the result key and has not been touched since."""
+    if _cache_dir is None:
+        return False
+    stamp = _read_json(_output_stamp_path(path))
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    return stamp == {'key': key, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def mark_written(path, key):
+    """Records that path now holds the output of the result key (see is_current)."""
+    if _cache_dir is None:
+        return
+    stat = os.stat(path)
+    stamp = {'key': key, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    _write_atomic(_output_stamp_path(path), lambda f: f.write(json.dumps(stamp).encode('utf-8')))
+
+
+def prune():
+    """Deletes stored results that no recording points at any more; returns how many.
+
+    A result shared by several recordings (identical content) is kept while any of
+    them points at it. Call it only when no run is in progress (a result stored but
+    not yet pointed at would go).
+    """
+    if _cache_dir is None:
+        return 0
+    latest_dir = os.path.join(_cache_dir, 'latest')
+    objects_dir = os.path.join(_cache_dir, 'objects')
+    pointers = [_read_json(os.path.join(latest_dir, name))
+                for name in (os.listdir(latest_dir) if os.path.isdir(latest_dir) else [])]
+    keep = {pointer['key'] + '.npz' for pointer in pointers if pointer}
+    removed = 0
+    for name in os.listdir(objects_dir) if os.path.isdir(objects_dir) else []:
+        if name.endswith('.npz') and name not in keep:
+            try:
+                os.remove(os.path.join(objects_dir, name))
+                removed += 1
+            except OSError:
+                pass
+    return removed
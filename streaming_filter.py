@@ -0,0 +1,132 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import sys
+
+from convolution import symmetric_taps, convolve_symmetric_window, prefers_symmetric
+from filter_design import design_lowpass
+
+# --- Parameters ---
+INPUT_FILE = 'resampled_data.f64'
+FS = 50.0  # Sampling frequency (Hz)
+CUTOFF_FREQ = 10.0  # Cutoff frequency (Hz)
+FILTER_ORDER = 40  # Filter order
+NUMTAPS = FILTER_ORDER + 1
+MAX_BLOCK = 4096  # Largest block processed in one pass; bigger blocks are split
+DEMO_BLOCK_SIZE = 7  # Block size used when streaming INPUT_FILE in the demo
+# ------------------
+
+
+class StreamingFIRFilter:
+    """Causal FIR filter that keeps its delay line between calls, like lfilter with zi.
+
+    Samples live in a mirrored ring buffer (every sample is written at k and k + R), so
+    the delay line plus the current block is always one contiguous slice. Each block then
+    costs O(block x taps) with no allocation beyond the optional output array.
+
+    Symmetric (linear-phase) coefficients, like the firwin low-pass, are detected and
+    run through convolve_symmetric_window(), which pre-adds mirrored samples and needs
+    half the multiplies, for the block sizes where that is faster (single samples, long
+    blocks). symmetric=True uses it for every block, symmetric=False never.
+    dtype=np.float32 keeps the delay line and outputs in float32 (compact mode).
+    """
+
+    def __init__(self, coeffs, n_channels=None, max_block=MAX_BLOCK, symmetric=None, dtype=np.float64):
+        self.dtype = np.dtype(dtype)
+        self.coeffs = np.asarray(coeffs, dtype=self.dtype)
+        if self.coeffs.ndim != 1 or len(self.coeffs) == 0:
+            raise ValueError("coeffs must be a non-empty 1-D array.")
+        self.n_channels = n_channels
+        self.max_block = int(max_block)
+        self._coeffs_rev = np.ascontiguousarray(self.coeffs[::-1])
+        self.symmetric = symmetric
+        self._taps = symmetric_taps(self.coeffs) if symmetric is not False else None
+        if symmetric and self._taps is None:
+            raise ValueError("symmetric=True needs symmetric (linear-phase) coefficients.")
+        self._history = len(self.coeffs) - 1  # Delay-line length
+        self._ring_len = self._history + self.max_block
+        channel_shape = () if n_channels is None else (n_channels,)
+        self._ring = np.zeros((2 * self._ring_len,) + channel_shape, dtype=self.dtype)
+        self._scratch = np.empty((self.max_block,) + channel_shape, dtype=self.dtype) if self._taps is not None else None
+        self._pos = 0  # Ring index where the next sample is written
+        self.reset()
+
+    @classmethod
+    def lowpass(cls, fs=FS, cutoff=CUTOFF_FREQ, numtaps=NUMTAPS, window='hamming', **kwargs):
+        """Builds a filter from the same firwin low-pass design used by apply_filter.py."""
+        return cls(design_lowpass(fs, cutoff, numtaps, window=window), **kwargs)
+
+    def reset(self, value=0.0):
+        """Clears the delay line; a non-zero value starts in steady state for that input level."""
+        self._ring[:] = value
+        self._pos = 0
+
+    @property
+    def delay_line(self):
+        """The last taps-1 input samples, oldest first (a copy)."""
+        idx = (self._pos - self._history + np.arange(self._history)) % self._ring_len
+        return self._ring[idx].copy()
+
+    def _write(self, block):
+        """Writes block at the current position into both halves of the ring."""
+        n = len(block)
+        first = min(n, self._ring_len - self._pos)
+        for offset in (0, self._ring_len):
+            self._ring[offset + self._pos : offset + self._pos + first] = block[:first]
+            self._ring[offset : offset + n - first] = block[first:]
+        self._pos = (self._pos + n) % self._ring_len
+
+    def process(self, block, out=None):
+        """Filters the next block of samples (any length) and returns the output block."""
+        block = np.asarray(block, dtype=self.dtype)
+        expected_ndim = 1 if self.n_channels is None else 2
+        if block.ndim != expected_ndim or (expected_ndim == 2 and block.shape[1] != self.n_channels):
+            raise ValueError(f"Expected block of shape {'(n,)' if expected_ndim == 1 else f'(n, {self.n_channels})'}, got {block.shape}.")
+        if out is None:
+            out = np.empty(block.shape, dtype=self.dtype)
+
+        for start in range(0, len(block), self.max_block):
+            piece = block[start : start + self.max_block]
+            n = len(piece)
+            window_start = (self._pos - self._history) % self._ring_len
+            self._write(piece)
+            # Delay line followed by the new samples, contiguous thanks to the mirror
+            window = self._ring[window_start : window_start + self._history + n]
+            if self._taps is not None and (self.symmetric or prefers_symmetric(n, len(self.coeffs))):
+                convolve_symmetric_window(window, self._taps, len(self.coeffs), out[start : start + n],
+                                          self._scratch[:n])
+            else:
+                np.matmul(sliding_window_view(window, len(self.coeffs), axis=0), self._coeffs_rev,
+                          out=out[start : start + n])
+        return out
+
+    def process_sample(self, sample):
+        """Filters a single sample (scalar, or one value per channel)."""
+        return self.process(np.asarray(sample, dtype=self.dtype)[np.newaxis])[0]
+
+
+def main():
+    from convolution import causal_convolve
+    from data_io import load_table
+
+    print(f"Loading resampled data from {INPUT_FILE}...")
+    try:
+        df = load_table(INPUT_FILE)
+    except FileNotFoundError:
+        print(f"Error: Input file '{INPUT_FILE}' not found.")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error reading file: {e}")
+        sys.exit(1)
+
+    data = np.column_stack((df['xaccel'], df['yaccel']))
+    fir = StreamingFIRFilter.lowpass(n_channels=data.shape[1])
+    print(f"Streaming {len(data)} samples through the filter in blocks of {DEMO_BLOCK_SIZE}...")
+    streamed = np.concatenate([fir.process(data[i : i + DEMO_BLOCK_SIZE])
+                               for i in range(0, len(data), DEMO_BLOCK_SIZE)])
+
+    offline = causal_convolve(data, fir.coeffs, method='dot')
+    print(f"Max abs difference vs. offline manual convolution: {np.max(np.abs(streamed - offline)):.3e}")
+
+
+if __name__ == '__main__':
+    main()
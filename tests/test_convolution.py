@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from scipy import signal
+
+from convolution import causal_convolve, CONVOLUTION_METHODS, FFT_MIN_SAMPLES, FFT_MIN_TAPS
+from filter_design import design_lowpass
+from streaming_filter import StreamingFIRFilter
+
+FS = 50.0
+CUTOFF_FREQ = 10.0
+TOLERANCE = dict(rtol=1e-12, atol=1e-12)
+
+
+def random_signal(shape, seed=0):
+    return np.random.default_rng(seed).normal(size=shape)
+
+
+@pytest.mark.parametrize('method', CONVOLUTION_METHODS)
+@pytest.mark.parametrize('numtaps', [41, FFT_MIN_TAPS + 1])
+def test_engines_match_lfilter(method, numtaps):
+    coeffs = design_lowpass(FS, CUTOFF_FREQ, numtaps)
+    # Long enough that 'auto' picks fft for the longer filter
+    data = random_signal((FFT_MIN_SAMPLES + 123, 2))
+    np.testing.assert_allclose(causal_convolve(data, coeffs, method=method),
+                               signal.lfilter(coeffs, 1.0, data, axis=0), **TOLERANCE)
+
+
+@pytest.mark.parametrize('numtaps', [41, 40])
+@pytest.mark.parametrize('shape', [(3000,), (3000, 2)])
+def test_symmetric_matches_dot(numtaps, shape):
+    coeffs = design_lowpass(FS, CUTOFF_FREQ, numtaps)
+    data = random_signal(shape)
+    expected = causal_convolve(data, coeffs, method='dot')
+    np.testing.assert_allclose(causal_convolve(data, coeffs, method='symmetric'), expected, **TOLERANCE)
+    np.testing.assert_allclose(expected, signal.lfilter(coeffs, 1.0, data, axis=0), **TOLERANCE)
+
+
+@pytest.mark.parametrize('numtaps', [41, 40])
+def test_symmetric_along_other_axis(numtaps):
+    coeffs = design_lowpass(FS, CUTOFF_FREQ, numtaps)
+    data = random_signal((2, 3000, 3))
+    np.testing.assert_allclose(causal_convolve(data, coeffs, method='symmetric', axis=1),
+                               signal.lfilter(coeffs, 1.0, data, axis=1), **TOLERANCE)
+
+
+def test_symmetric_rejects_asymmetric_coefficients():
+    with pytest.raises(ValueError):
+        causal_convolve(random_signal(100), np.arange(1.0, 6.0), method='symmetric')
+
+
+@pytest.mark.parametrize('numtaps', [41, 40])
+@pytest.mark.parametrize('n_channels', [None, 2])
+@pytest.mark.parametrize('block_size', [1, 7, 300])
+def test_streaming_symmetric_matches_dot(numtaps, n_channels, block_size):
+    coeffs = design_lowpass(FS, CUTOFF_FREQ, numtaps)
+    data = random_signal((1000,) if n_channels is None else (1000, n_channels))
+    # max_block below 300, so the largest blocks are split inside process()
+    fir = StreamingFIRFilter(coeffs, n_channels=n_channels, max_block=128, symmetric=True)
+    streamed = np.concatenate([fir.process(data[i : i + block_size]) for i in range(0, len(data), block_size)])
+    np.testing.assert_allclose(streamed, causal_convolve(data, coeffs, method='dot'), **TOLERANCE)
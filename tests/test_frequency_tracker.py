@@ -0,0 +1,37 @@
+import numpy as np
+
+from frequency_tracker import SlidingDFTTracker
+
+FS = 50.0
+WINDOW_LEN = 64
+
+
+def test_sliding_dft_matches_fft_of_window():
+    rng = np.random.default_rng(0)
+    n = 3000
+    t = np.arange(n) / FS
+    # Dominant tones on bins 10 and 23, plus noise
+    data = np.column_stack((np.sin(2 * np.pi * 10 * FS / WINDOW_LEN * t), np.cos(2 * np.pi * 23 * FS / WINDOW_LEN * t)))
+    data += rng.normal(scale=0.1, size=data.shape)
+
+    # Small resync interval, so both the running sums and the exact recompute are exercised
+    tracker = SlidingDFTTracker(FS, WINDOW_LEN, resync_interval=500)
+    single = SlidingDFTTracker(FS, WINDOW_LEN, resync_interval=500)
+    start = 0
+    for size in rng.integers(1, 150, size=1000):
+        block = data[start : start + size]
+        if len(block) == 0:
+            break
+        freq, _ = tracker.update(block)
+        for sample in block:
+            single_freq, _ = single.process_sample(sample)
+        start += len(block)
+
+        if start >= WINDOW_LEN:
+            expected = np.abs(np.fft.rfft(data[start - WINDOW_LEN : start], axis=0))[tracker.bins]
+            np.testing.assert_allclose(tracker.magnitude, expected, rtol=1e-9, atol=1e-9)
+            np.testing.assert_allclose(single.magnitude, expected, rtol=1e-9, atol=1e-9)
+            np.testing.assert_array_equal(freq[-1], single_freq)
+        else:
+            assert np.all(np.isnan(freq))
+    np.testing.assert_array_equal(freq[-1], [10 * FS / WINDOW_LEN, 23 * FS / WINDOW_LEN])
@@ -0,0 +1,45 @@
+import json
+
+import numpy as np
+import pytest
+
+import result_cache
+from instrumentation import set_metrics_file
+from pipeline import run_pipeline
+
+STAGES = ('resample', 'filter', 'analyze')
+
+
+def jittered_recording(n_rows=6000, seed=0):
+    rng = np.random.default_rng(seed)
+    time_sec = np.cumsum(rng.uniform(0.015, 0.03, n_rows))
+    return time_sec, rng.normal(size=(n_rows, 2))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """Result cache and metrics switched on for one test."""
+    result_cache.set_cache_dir(str(tmp_path / 'cache'))
+    set_metrics_file(str(tmp_path / 'metrics.jsonl'))
+    yield tmp_path / 'metrics.jsonl'
+    result_cache.set_cache_dir(None)
+    set_metrics_file(None)
+
+
+@pytest.mark.parametrize('filter_method', ['filtfilt', 'direct'])
+def test_appended_rows_match_uncached_run(cache, tmp_path, filter_method):
+    time_sec, data = jittered_recording()
+    run_pipeline(time_sec[:4000], data[:4000], stages=STAGES, filter_method=filter_method,
+                 output_dir=str(tmp_path), source='recording')
+    extended = run_pipeline(time_sec, data, stages=STAGES, filter_method=filter_method,
+                            output_dir=str(tmp_path), source='recording')
+    with open(cache) as f:
+        records = [json.loads(line) for line in f][-len(STAGES):]
+    assert {record['stage']: record['cache'] for record in records} == {
+        'resample': 'append', 'filter': 'append', 'analyze': 'miss'}
+
+    result_cache.set_cache_dir(None)
+    expected = run_pipeline(time_sec, data, stages=STAGES, filter_method=filter_method, output_dir=str(tmp_path))
+    for name in ('time', 'resampled', 'filtered'):
+        np.testing.assert_array_equal(extended[name], expected[name])
+    np.testing.assert_array_equal(extended['spectrum']['magnitude'], expected['spectrum']['magnitude'])
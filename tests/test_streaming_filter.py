@@ -0,0 +1,21 @@
+import numpy as np
+from scipy import signal
+
+from streaming_filter import StreamingFIRFilter
+
+
+def test_state_carries_across_calls():
+    rng = np.random.default_rng(0)
+    # Uneven block sizes that wrap the ring buffer many times and split at max_block
+    sizes = rng.integers(1, 200, size=100)
+    data = rng.normal(size=(sizes.sum(), 2))
+    fir = StreamingFIRFilter.lowpass(n_channels=2, max_block=64, symmetric=False)
+    zi = np.zeros((len(fir.coeffs) - 1, 2))  # lfilter's state, carried by hand
+
+    start = 0
+    for size in sizes:
+        block = data[start : start + size]
+        expected, zi = signal.lfilter(fir.coeffs, 1.0, block, axis=0, zi=zi)
+        np.testing.assert_allclose(fir.process(block), expected, rtol=1e-12, atol=1e-12)
+        start += size
+    np.testing.assert_array_equal(fir.delay_line, data[start - len(fir.coeffs) + 1 : start])
@@ -0,0 +1,26 @@
+import os
+
+# --- Parameters ---
+QUIET_ENV = 'PIPELINE_QUIET'  # Set to 1 to run every script in quiet (production) mode
+# ------------------
+
+_quiet = os.environ.get(QUIET_ENV, '').strip() not in ('', '0')
+
+
+def set_quiet(quiet=True):
+    """Quiet mode: progress chatter, debug dumps and verification read-backs are skipped.
+
+    Warnings and errors are still printed.
+    """
+    global _quiet
+    _quiet = bool(quiet)
+
+
+def is_quiet():
+    return _quiet
+
+
+def info(*args, **kwargs):
+    """print() that is silenced in quiet mode."""
+    if not _quiet:
+        print(*args, **kwargs)
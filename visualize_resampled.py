@@ -1,53 +1,55 @@
-import pandas as pd
-import matplotlib.pyplot as plt
 import sys
+import argparse
+
+from data_io import load_table
+from instrumentation import stage
+from verbosity import info
 
 # --- Parameters ---
-INPUT_FILE = 'resampled_data.txt'
+INPUT_FILE = 'resampled_data.f64'
 OUTPUT_PLOT_FILE = 'resampled_visualization.png'
+FS = 50.0  # Sampling frequency of the resampled data (Hz), used in the title
 # ------------------
 
-print(f"Loading resampled data from {INPUT_FILE}...")
-try:
-    df = pd.read_csv(INPUT_FILE, sep='\t', header=0)
-except FileNotFoundError:
-    print(f"Error: Input file '{INPUT_FILE}' not found.")
-    print("Please run the resampling script first.")
-    sys.exit(1)
-except Exception as e:
-    print(f"Error reading file: {e}")
-    sys.exit(1)
-
-print(f"Generating plot...")
-
-# Create figure and axes for subplots
-fig, axes = plt.subplots(nrows=2, ncols=1, figsize=(12, 8), sharex=True)
-fig.suptitle('Resampled Accelerometer Data (50 Hz)', fontsize=16)
-
-# Plot xaccel
-axes[0].plot(df['time'], df['xaccel'], label='xaccel', color='blue')
-axes[0].set_ylabel('X Acceleration')
-axes[0].set_title('X Acceleration vs. Time')
-axes[0].grid(True)
-axes[0].legend()
-
-# Plot yaccel
-axes[1].plot(df['time'], df['yaccel'], label='yaccel', color='red')
-axes[1].set_xlabel('Time (s)')
-axes[1].set_ylabel('Y Acceleration')
-axes[1].set_title('Y Acceleration vs. Time')
-axes[1].grid(True)
-axes[1].legend()
-
-# Adjust layout
-plt.tight_layout(rect=[0, 0.03, 1, 0.95]) # Adjust rect to make space for suptitle
-
-# Save the plot
-try:
-    plt.savefig(OUTPUT_PLOT_FILE)
-    print(f"Plot saved to {OUTPUT_PLOT_FILE}")
-except Exception as e:
-    print(f"Error saving plot: {e}")
-
-# Optional: Display the plot if running in an environment that supports it
-# plt.show() 
\ No newline at end of file
+
+# --- Resampled Data Plot ---
+def plot_resampled(time, xaccel, yaccel, output_plot_file=OUTPUT_PLOT_FILE, fs=FS):
+    """Plots xaccel and yaccel against time in two stacked subplots (envelope-decimated)."""
+    from plotting import stacked_plot
+
+    panels = [
+        {'title': 'X Acceleration vs. Time', 'ylabel': 'X Acceleration',
+         'series': [(time, xaccel, {'label': 'xaccel', 'color': 'blue'})]},
+        {'title': 'Y Acceleration vs. Time', 'ylabel': 'Y Acceleration',
+         'series': [(time, yaccel, {'label': 'yaccel', 'color': 'red'})]},
+    ]
+    if stacked_plot().draw(f'Resampled Accelerometer Data ({fs:g} Hz)', panels, output_plot_file):
+        info(f"Plot saved to {output_plot_file}")
+# ---------------------------
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Plot the resampled accelerometer data.')
+    parser.add_argument('--input', default=INPUT_FILE,
+                        help=f'Resampled data, binary or text (default: {INPUT_FILE}).')
+    args = parser.parse_args()
+
+    print(f"Loading resampled data from {args.input}...")
+    try:
+        with stage('load') as record:
+            df = load_table(args.input)
+            record['n_samples'] = len(df['time'])
+    except FileNotFoundError:
+        print(f"Error: Input file '{args.input}' not found.")
+        print("Please run the resampling script first.")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error reading file: {e}")
+        sys.exit(1)
+
+    print(f"Generating plot...")
+    with stage('plot', len(df['time'])):
+        plot_resampled(df['time'], df['xaccel'], df['yaccel'], OUTPUT_PLOT_FILE, FS)
+
+if __name__ == '__main__':
+    main()